@@ -1,15 +1,39 @@
 # File: app/api/dependencies.py
 from motor.motor_asyncio import AsyncIOMotorClient
+from typing import Optional
 from config.settings import settings
 from services.llm_service import LLMService
 from services.embeddings_service import EmbeddingsService
 from services.rag_service import RAGService
 from services.document_service import DocumentService
 from services.storage_service import StorageService
+from services.ingestion_index import IngestionIndex
+
+_mongo_client: Optional[AsyncIOMotorClient] = None
+
+def connect_db() -> AsyncIOMotorClient:
+    """Create the shared Mongo client; it owns one connection pool per process."""
+    global _mongo_client
+    if _mongo_client is None:
+        _mongo_client = AsyncIOMotorClient(
+            settings.MONGO_URI,
+            maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+            serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            connectTimeoutMS=settings.MONGO_CONNECT_TIMEOUT_MS,
+            socketTimeoutMS=settings.MONGO_SOCKET_TIMEOUT_MS,
+            readPreference=settings.MONGO_READ_PREFERENCE
+        )
+    return _mongo_client
+
+def close_db():
+    global _mongo_client
+    if _mongo_client is not None:
+        _mongo_client.close()
+        _mongo_client = None
 
 async def get_db():
-    client = AsyncIOMotorClient(settings.MONGO_URI)
-    return client[settings.DB_NAME]
+    return connect_db()[settings.DB_NAME]
 
 def get_llm_service():
     return LLMService(settings.get_models_config())
@@ -28,6 +52,7 @@ def get_rag_service(
 
 def get_document_service(
     embeddings_service: EmbeddingsService,
-    storage_service: StorageService
+    storage_service: StorageService,
+    ingestion_index: Optional[IngestionIndex] = None
 ):
-    return DocumentService(embeddings_service, storage_service)
+    return DocumentService(embeddings_service, storage_service, ingestion_index)
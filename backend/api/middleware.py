@@ -0,0 +1,66 @@
+# File: app/api/middleware.py
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+class UploadLimitMiddleware:
+    """Reject upload requests over max_bytes before their body is parsed.
+
+    FastAPI reads the whole multipart body into temporary files before an
+    endpoint runs, so limits checked in the endpoint only apply after every
+    byte has been received. This checks Content-Length up front and counts
+    the bytes of chunked bodies as they arrive.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, path_suffixes: tuple):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.path_suffixes = path_suffixes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].endswith(self.path_suffixes):
+            await self.app(scope, receive, send)
+            return
+
+        too_large = PlainTextResponse(
+            f"Upload exceeds the request size limit of {self.max_bytes} bytes",
+            status_code=413
+        )
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Stop reading; whatever error the app makes of the cut-off
+                    # body is replaced with a 413 below
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def limited_send(message):
+            nonlocal response_started
+            if exceeded and not response_started:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            if not exceeded or response_started:
+                raise
+        if exceeded and not response_started:
+            await too_large(scope, receive, send)
@@ -2,7 +2,9 @@
 from fastapi import APIRouter, HTTPException, Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import List
-from core.models import RAGAgent
+from core.models import RAGAgent, RAGConfig
+from services.chain_registry import chain_registry
+from services.sql_service import refresh_schema_summary, run_sql_blocking
 from ..dependencies import get_db
 from config.settings import Settings
 import json
@@ -10,7 +12,6 @@ import json
 router = APIRouter()
 
 settings = Settings()
-MODELS_CONFIG = settings.get_models_config()
 
 @router.post("", response_model=RAGAgent)
 async def create_agent(
@@ -53,6 +54,8 @@ async def update_agent(
     
     if result.modified_count == 0:
         raise HTTPException(status_code=400, detail="Update failed")
+
+    chain_registry.invalidate(agent_id)
     
     updated_agent = await db.agents.find_one({"id": agent_id})
     return RAGAgent(**updated_agent)
@@ -74,12 +77,37 @@ async def delete_agent(
     if result.deleted_count == 0:
         raise HTTPException(status_code=400, detail="Delete failed")
     
+    chain_registry.invalidate(agent_id)
+
     # Also delete related data
     await db.metrics.delete_many({"agent_id": agent_id})
+    await db.metrics_hourly.delete_many({"agent_id": agent_id})
+    await db.metrics_monthly.delete_many({"agent_id": agent_id})
     await db.evaluations.delete_many({"agent_id": agent_id})
+    await db.evaluation_results.delete_many({"agent_id": agent_id})
     
     return {"message": "Agent deleted successfully"}
 
+@router.post("/{agent_id}/sql/schema/refresh")
+async def refresh_sql_schema(
+    agent_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    agent = await db.agents.find_one({"id": agent_id})
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    rag_config = RAGConfig(**agent["config"])
+    if not rag_config.sql_config:
+        raise HTTPException(status_code=400, detail="Agent has no SQL configuration")
+
+    try:
+        schema = await run_sql_blocking(refresh_schema_summary, rag_config.sql_config)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"schema": schema}
+
 @router.get("/models")
 async def get_models(db: AsyncIOMotorDatabase = Depends(get_db)):
     """Returns available models as a dictionary with model IDs as keys and display names as values"""
@@ -93,7 +121,7 @@ async def get_models(db: AsyncIOMotorDatabase = Depends(get_db)):
     try:
         return {
             model_id: config.get("name", default_models.get(model_id, model_id))
-            for model_id, config in MODELS_CONFIG.items()
+            for model_id, config in settings.get_models_config().items()
         }
     except Exception:
         # Fallback to default models if there's any error
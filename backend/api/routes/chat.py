@@ -1,14 +1,18 @@
 # File: app/api/routes/chat.py
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import StreamingResponse
-from datetime import datetime
 import time
 import asyncio
+import anyio
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from core.models import ChatRequest, RAGAgent, RAGConfig
 from services.rag_service import RAGService
 from services.llm_service import LLMService
 from services.embeddings_service import EmbeddingsService
+from services.chain_registry import chain_registry
+from services.metrics_aggregator import metrics_aggregator
+from services.stage_metrics import StageTimingHandler
+from config.settings import settings
 from ..dependencies import get_db, get_llm_service, get_embeddings_service, get_rag_service
 from langchain_core.messages import AIMessage, HumanMessage
 
@@ -18,7 +22,7 @@ router = APIRouter()
 async def chat(
     agent_id: str,
     request: ChatRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
     db: AsyncIOMotorDatabase = Depends(get_db),
     llm_service: LLMService = Depends(get_llm_service)
 ):
@@ -30,9 +34,14 @@ async def chat(
     try:
         # Initialize services with agent configuration
         rag_config = RAGConfig(**agent["config"])
-        embeddings_service = get_embeddings_service(rag_config.advancedEmbeddingsConfig)
-        rag_service = get_rag_service(llm_service, embeddings_service)
-        rag_chain = rag_service.get_chain(rag_config)
+
+        def build_chain():
+            embeddings_service = get_embeddings_service(rag_config.advancedEmbeddingsConfig)
+            rag_service = get_rag_service(llm_service, embeddings_service)
+            return rag_service.get_chain(rag_config)
+
+        rag_chain = chain_registry.get_or_build(agent_id, rag_config, build_chain)
+        stage_timer = StageTimingHandler(agent_id, RAGService.resolve_chain_type(rag_config))
 
         chat_history = [
             HumanMessage(content=msg.content) if msg.role == "user" 
@@ -40,96 +49,69 @@ async def chat(
             for msg in request.messages[:-1]
         ]
         
-        metrics_queue = asyncio.Queue()
-        
+        async def wait_for_disconnect():
+            while not await http_request.is_disconnected():
+                await asyncio.sleep(settings.CHAT_DISCONNECT_POLL_INTERVAL)
+
         async def generate_response():
+            first_token_time = None
+            outcome = "failed"
+            stream = rag_chain.astream({
+                "input": request.messages[-1].content,
+                "chat_history": chat_history
+            }, config={"callbacks": [stage_timer]})
+            disconnected = asyncio.create_task(wait_for_disconnect())
+            next_chunk = None
             try:
-                is_first_token = True
-                async for chunk in rag_chain.astream({
-                    "input": request.messages[-1].content,
-                    "chat_history": chat_history
-                }):
-                    if is_first_token:
-                        await metrics_queue.put(time.time())
-                        is_first_token = False
+                while True:
+                    # Race every chunk against the client going away, so an
+                    # abandoned answer stops the chain, the LLM stream and any
+                    # running SQL instead of generating for nobody
+                    next_chunk = asyncio.ensure_future(stream.__anext__())
+                    await asyncio.wait({next_chunk, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+                    if not next_chunk.done():
+                        outcome = "cancelled"
+                        break
+                    try:
+                        chunk = next_chunk.result()
+                    except StopAsyncIteration:
+                        outcome = "completed"
+                        break
+                    if first_token_time is None:
+                        first_token_time = time.time()
                     if isinstance(chunk, dict):
                         answer = chunk.get("answer", "")
                     else:
                         answer = str(chunk)
                     yield answer
-                
-                await metrics_queue.put(None)
-            except Exception as e:
-                await metrics_queue.put(None)
-                raise e
+            except (asyncio.CancelledError, GeneratorExit):
+                outcome = "cancelled"
+                raise
+            finally:
+                # Record before awaiting anything: when Starlette's own
+                # disconnect listener cancels this generator, any await
+                # below is cancelled again unless shielded
+                record_metrics(outcome, first_token_time)
+                disconnected.cancel()
+                with anyio.CancelScope(shield=True):
+                    if next_chunk is not None and not next_chunk.done():
+                        next_chunk.cancel()
+                        await asyncio.gather(next_chunk, return_exceptions=True)
+                    await stream.aclose()
 
-        async def update_metrics():
+        def record_metrics(outcome, first_token_time):
             try:
-                first_token_time = await metrics_queue.get()
-                if first_token_time is not None:
-                    await metrics_queue.get()
-                    end_time = time.time()
-                    
-                    current_date = datetime.utcnow().replace(
-                        hour=0, minute=0, second=0, microsecond=0
+                if outcome == "completed" and first_token_time is not None:
+                    metrics_aggregator.record(
+                        agent_id,
+                        first_token_latency=first_token_time - start_time,
+                        total_response_time=time.time() - start_time
                     )
-                    
-                    first_token_latency = first_token_time - start_time
-                    total_response_time = end_time - start_time
-
-                    current_metrics = await db.metrics.find_one({
-                        "agent_id": agent_id,
-                        "date": current_date
-                    })
-
-                    if current_metrics:
-                        current_calls = current_metrics.get("calls", 0)
-                        current_ftl_avg = current_metrics.get("first_token_latency", 0)
-                        current_trt_avg = current_metrics.get("total_response_time", 0)
-                        
-                        new_calls = current_calls + 1
-                        new_ftl_avg = ((current_ftl_avg * current_calls) + first_token_latency) / new_calls
-                        new_trt_avg = ((current_trt_avg * current_calls) + total_response_time) / new_calls
-
-                        await db.metrics.update_one(
-                            {
-                                "agent_id": agent_id,
-                                "date": current_date
-                            },
-                            {
-                                "$set": {
-                                    "calls": new_calls,
-                                    "first_token_latency": new_ftl_avg,
-                                    "total_response_time": new_trt_avg
-                                }
-                            }
-                        )
-                    else:
-                        await db.metrics.insert_one({
-                            "agent_id": agent_id,
-                            "date": current_date,
-                            "calls": 1,
-                            "first_token_latency": first_token_latency,
-                            "total_response_time": total_response_time
-                        })
                 else:
-                    current_date = datetime.utcnow().replace(
-                        hour=0, minute=0, second=0, microsecond=0
-                    )
-                    await db.metrics.update_one(
-                        {
-                            "agent_id": agent_id,
-                            "date": current_date
-                        },
-                        {
-                            "$inc": {"calls": 1}
-                        },
-                        upsert=True
-                    )
+                    metrics_aggregator.record(agent_id, outcome=outcome)
             except Exception as e:
                 print(f"Error updating metrics: {str(e)}")
 
-        background_tasks.add_task(update_metrics)
         return StreamingResponse(generate_response(), media_type="text/plain")
     
     except Exception as e:
@@ -1,79 +1,63 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from typing import Any, Dict, List
 import uuid
 import os
-from datetime import datetime
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from core.models import RAGAgent, RAGConfig
-from services.document_service import DocumentService
-from services.storage_service import StorageService
-from services.embeddings_service import EmbeddingsService
+from core.models import RAGConfig, S3IngestRequest
+from services.ingestion_index import IngestionIndex
+from services.ingestion_jobs import enqueue_ingestion, enqueue_s3_ingestion
+from services.storage_service import save_upload_file, UploadTooLargeError
 from ..dependencies import get_db, get_document_service, get_embeddings_service, get_storage_service
 from config.settings import settings
-import aiofiles
-import asyncio
 
 router = APIRouter()
 
+def _upload_extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lstrip('.').lower()
+
+async def _save_single_upload(file: UploadFile, replace_by_source: bool = False) -> Dict[str, Any]:
+    # By now FastAPI has already spooled the body to a temporary file;
+    # UploadLimitMiddleware is what bounds the request before that happens
+    file_extension = _upload_extension(file.filename)
+    if file_extension not in settings.ALLOWED_UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported file type: {file.filename}")
+
+    unique_filename = f"{uuid.uuid4()}.{file_extension}"
+    file_path = settings.UPLOAD_DIR / unique_filename
+
+    # Ensure upload directory exists
+    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+
+    try:
+        saved = await save_upload_file(file, file_path, settings.MAX_UPLOAD_FILE_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    return {
+        "path": file_path,
+        "extension": file_extension,
+        "original_name": file.filename,
+        "replace_by_source": replace_by_source,
+        **saved
+    }
+
 @router.post("/{agent_id}/documents")
 async def add_document(
     agent_id: str,
     file: UploadFile,
-    db: AsyncIOMotorDatabase = Depends(get_db),
-    embeddings_service: EmbeddingsService = Depends(get_embeddings_service)
+    replace_by_source: bool = Form(False),
+    db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     agent = await db.agents.find_one({"id": agent_id})
     if not agent:
         raise HTTPException(status_code=404, detail="Agent not found")
 
-    file_extension = os.path.splitext(file.filename)[1]
-    unique_filename = f"{uuid.uuid4()}{file_extension}"
-    file_path = settings.UPLOAD_DIR / unique_filename
-
-    # Ensure upload directory exists
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    # With replace_by_source the file name sent by the client (a relative
+    # path for folder uploads) identifies the document to update
+    file_info = await _save_single_upload(file, replace_by_source)
 
-    # Save file using aiofiles
-    async with aiofiles.open(file_path, "wb") as buffer:
-        content = await file.read()
-        await buffer.write(content)
-
-    job_id = str(uuid.uuid4())
-    await db.jobs.insert_one({
-        "_id": job_id,
-        "agent_id": agent_id,
-        "status": "processing",
-        "progress": 0.0,
-        "created_at": datetime.utcnow()
-    })
-
-    storage_service = get_storage_service()
-    document_service = get_document_service(embeddings_service, storage_service)
-    
-    try:
-        await document_service.process_document(
-            file_path,
-            agent["config"]["collection"],
-            file_extension.lstrip('.')
-        )
-        
-        # Clean up the temporary file
-        os.remove(file_path)
-        
-        await db.jobs.update_one(
-            {"_id": job_id},
-            {"$set": {"status": "completed", "progress": 1.0}}
-        )
-    except Exception as e:
-        # Clean up the temporary file even if processing failed
-        if os.path.exists(file_path):
-            os.remove(file_path)
-            
-        await db.jobs.update_one(
-            {"_id": job_id},
-            {"$set": {"status": "failed", "error": str(e)}}
-        )
-        raise HTTPException(status_code=500, detail=str(e))
+    # Ingestion runs on a job worker; clients poll /jobs/{job_id}
+    job_id = await enqueue_ingestion(db, agent_id, [file_info])
     
     return {"job_id": job_id}
 
@@ -81,7 +65,7 @@ async def add_document(
 async def bulk_add_documents(
     agent_id: str,
     files: List[UploadFile],
-    background_tasks: BackgroundTasks,
+    replace_by_source: bool = Form(False),
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     agent = await db.agents.find_one({"id": agent_id})
@@ -91,118 +75,142 @@ async def bulk_add_documents(
     # Ensure upload directory exists
     os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
-    job_id = str(uuid.uuid4())
-    await db.jobs.insert_one({
-        "_id": job_id,
-        "agent_id": agent_id,
-        "status": "processing",
-        "progress": 0.0,
-        "created_at": datetime.utcnow(),
-        "total_files": len(files),
-        "processed_files": 0,
-        "errors": []
-    })
-
-    # Save all files first and store their paths
+    # Stream every file to disk and store their paths
     file_paths = []
+    errors = []
+    remaining_bytes = settings.MAX_UPLOAD_REQUEST_BYTES
     for file in files:
-        try:
-            file_extension = os.path.splitext(file.filename)[1]
-            unique_filename = f"{uuid.uuid4()}{file_extension}"
-            file_path = settings.UPLOAD_DIR / unique_filename
-            
-            # Save using aiofiles
-            content = await file.read()  # Read the file content first
-            async with aiofiles.open(file_path, "wb") as buffer:
-                await buffer.write(content)
-            
-            file_paths.append({
-                "path": file_path,
-                "extension": file_extension.lstrip('.'),
-                "original_name": file.filename
-            })
-        except Exception as e:
-            # If there's an error saving a file, log it but continue with others
-            error_message = f"Error saving {file.filename}: {str(e)}"
-            await db.jobs.update_one(
-                {"_id": job_id},
-                {"$push": {"errors": error_message}}
-            )
-
-    # Initialize services with agent configuration
-    rag_config = RAGConfig(**agent["config"])
-    embeddings_service = get_embeddings_service(rag_config.advancedEmbeddingsConfig)
-    storage_service = get_storage_service(rag_config.s3_config)
-    document_service = get_document_service(embeddings_service, storage_service)
+        file_extension = _upload_extension(file.filename)
+        if file_extension not in settings.ALLOWED_UPLOAD_EXTENSIONS:
+            errors.append(f"Error saving {file.filename}: Unsupported file type")
+            continue
 
-    async def process_files():
+        file_path = settings.UPLOAD_DIR / f"{uuid.uuid4()}.{file_extension}"
+        max_bytes = min(settings.MAX_UPLOAD_FILE_BYTES, remaining_bytes)
         try:
-            for file_info in file_paths:
-                try:
-                    await document_service.process_document(
-                        file_info["path"],
-                        agent["config"]["collection"],
-                        file_info["extension"]
-                    )
-
-                    # Clean up the temporary file
+            saved = await save_upload_file(file, file_path, max_bytes)
+        except UploadTooLargeError as e:
+            if max_bytes < settings.MAX_UPLOAD_FILE_BYTES:
+                # The request as a whole is over its limit; drop what was saved
+                for file_info in file_paths:
                     if os.path.exists(file_info["path"]):
                         os.remove(file_info["path"])
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"Upload exceeds the request size limit of {settings.MAX_UPLOAD_REQUEST_BYTES} bytes"
+                )
+            errors.append(f"Error saving {file.filename}: {str(e)}")
+            continue
+        except Exception as e:
+            # If there's an error saving a file, log it but continue with others
+            errors.append(f"Error saving {file.filename}: {str(e)}")
+            continue
+
+        remaining_bytes -= saved["size"]
+        file_paths.append({
+            "path": file_path,
+            "extension": file_extension,
+            "original_name": file.filename,
+            "replace_by_source": replace_by_source,
+            **saved
+        })
+
+    # Ingestion runs on a job worker so it survives restarts of this process
+    job_id = await enqueue_ingestion(db, agent_id, file_paths, errors)
+    
+    return {"job_id": job_id}
 
-                    # Update progress
-                    await db.jobs.update_one(
-                        {"_id": job_id},
-                        {
-                            "$inc": {"processed_files": 1},
-                            "$set": {"progress": (await db.jobs.find_one({"_id": job_id}))["processed_files"] / len(files)}
-                        }
-                    )
-
-                except Exception as e:
-                    error_message = f"Error processing {file_info['original_name']}: {str(e)}"
-                    await db.jobs.update_one(
-                        {"_id": job_id},
-                        {"$push": {"errors": error_message}}
-                    )
-                    # Clean up the temporary file if it exists
-                    if os.path.exists(file_info["path"]):
-                        os.remove(file_info["path"])
+@router.post("/{agent_id}/documents/s3")
+async def add_s3_documents(
+    agent_id: str,
+    request: S3IngestRequest,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    agent = await db.agents.find_one({"id": agent_id})
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
 
-            # Update final status
-            job = await db.jobs.find_one({"_id": job_id})
-            final_status = "completed" if job["processed_files"] == len(files) else "completed_with_errors"
-            
-            await db.jobs.update_one(
-                {"_id": job_id},
-                {"$set": {"status": final_status}}
-            )
+    if not RAGConfig(**agent["config"]).s3_config:
+        raise HTTPException(status_code=400, detail="Agent has no S3 configuration")
+
+    job_id = await enqueue_s3_ingestion(db, agent_id, request.prefix)
 
-        except Exception as e:
-            # Clean up any remaining temporary files
-            for file_info in file_paths:
-                if os.path.exists(file_info["path"]):
-                    os.remove(file_info["path"])
-                    
-            await db.jobs.update_one(
-                {"_id": job_id},
-                {"$set": {"status": "failed", "error": str(e)}}
-            )
-
-    # Start processing files in the background
-    background_tasks.add_task(process_files)
-    
     return {"job_id": job_id}
 
+@router.get("/{agent_id}/documents")
+async def list_documents(
+    agent_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    agent = await db.agents.find_one({"id": agent_id})
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    return await IngestionIndex(db).list(agent["config"]["collection"])
+
+@router.put("/{agent_id}/documents/{document_id}")
+async def replace_document(
+    agent_id: str,
+    document_id: str,
+    file: UploadFile,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    agent = await db.agents.find_one({"id": agent_id})
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    if not await IngestionIndex(db).get_by_id(agent["config"]["collection"], document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    file_info = await _save_single_upload(file)
+    job_id = await enqueue_ingestion(db, agent_id, [{**file_info, "document_id": document_id}])
+
+    return {"job_id": job_id, "document_id": document_id}
+
+@router.delete("/{agent_id}/documents/{document_id}")
+async def delete_document(
+    agent_id: str,
+    document_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    agent = await db.agents.find_one({"id": agent_id})
+    if not agent:
+        raise HTTPException(status_code=404, detail="Agent not found")
+
+    rag_config = RAGConfig(**agent["config"])
+    document_service = get_document_service(
+        get_embeddings_service(rag_config.advancedEmbeddingsConfig),
+        get_storage_service(),
+        IngestionIndex(db)
+    )
+    if not await document_service.delete_document(rag_config.collection, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    return {"message": "Document deleted successfully"}
+
+JOB_STATUS_PROJECTION = {
+    "files": 0,
+    "file_stats": 0,
+    "lease_owner": 0,
+    "lease_expires_at": 0,
+    "heartbeat_at": 0,
+    "attempts": 0,
+    "max_attempts": 0,
+    "next_attempt_at": 0
+}
+
 @router.get("/jobs/{job_id}")
 async def get_job_status(
     job_id: str,
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    job = await db.jobs.find_one({"_id": job_id})
+    # Polled every second; leave out the file list (server paths, S3
+    # listings), per-file stats and queue bookkeeping
+    job = await db.jobs.find_one({"_id": job_id}, JOB_STATUS_PROJECTION)
     if not job:
         raise HTTPException(status_code=404, detail="Job not found")
     
-    if "total_files" in job:
+    if job.get("total_files"):
         job["progress"] = job.get("processed_files", 0) / job["total_files"]
     
     return job
\ No newline at end of file
@@ -1,24 +1,25 @@
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, UploadFile
 from fastapi.responses import StreamingResponse
 from datetime import datetime
+from typing import Optional
 import time
 import asyncio
 import json
 import uuid
-import numpy as np
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from core.models import ChatRequest, RAGAgent, RAGConfig
 from services.rag_service import RAGService
 from services.llm_service import LLMService
 from services.embeddings_service import EmbeddingsService
+from services.chain_registry import chain_registry, config_fingerprint
+from services.evaluation_cache import EvaluationCache
+from services.ingestion_index import IngestionIndex
+from services.evaluation_service import EvaluationRunner, compute_aggregate_metrics
 from ..dependencies import get_db, get_llm_service, get_embeddings_service, get_rag_service
 from langchain_core.messages import AIMessage, HumanMessage
 
 router = APIRouter()
 
-def cosine_similarity(embedding1, embedding2):
-    return np.dot(embedding1, embedding2) / (np.linalg.norm(embedding1) * np.linalg.norm(embedding2))
-
 @router.post("/{agent_id}/evaluate")
 async def evaluate(
     agent_id: str,
@@ -53,79 +54,49 @@ async def evaluate(
         "created_at": datetime.utcnow()
     })
 
+    await db.evaluations.insert_one({
+        "agent_id": agent_id,
+        "job_id": job_id,
+        "timestamp": datetime.utcnow(),
+        "total_questions": len(eval_data),
+        "aggregate_metrics": None,
+        "status": "processing"
+    })
+
     async def process_evaluation():
         try:
             # Initialize services
             rag_config = RAGConfig(**agent["config"])
             embeddings_service = get_embeddings_service(rag_config.advancedEmbeddingsConfig)
             rag_service = get_rag_service(llm_service, embeddings_service)
-            rag_chain = rag_service.get_rag_chain(rag_config)
+            rag_chain = chain_registry.get_or_build(
+                agent_id, rag_config, lambda: rag_service.get_rag_chain(rag_config), chain_type="RAG ONLY"
+            )
             embeddings = embeddings_service.get_embeddings()
+            cache = EvaluationCache(
+                db,
+                config_fingerprint(rag_config),
+                await IngestionIndex(db).get_version(rag_config.collection),
+                embeddings_service.fingerprint()
+            )
 
-            evaluation_results = []
-            total_questions = len(eval_data)
-
-            for idx, qa_pair in enumerate(eval_data):
-                try:
-                    # Generate RAG response
-                    response = await rag_chain.ainvoke({
-                        "input": qa_pair["question"],
-                        "chat_history": []
-                    })
-                    generated_answer = response.get("answer", "")
-
-                    # Generate embeddings for both answers
-                    original_embedding = embeddings.embed_query(qa_pair["answer"])
-                    generated_embedding = embeddings.embed_query(generated_answer)
-
-                    # Calculate similarity score
-                    similarity_score = cosine_similarity(original_embedding, generated_embedding)
-
-                    # Store result
-                    result = {
-                        "question": qa_pair["question"],
-                        "original_answer": qa_pair["answer"],
-                        "generated_answer": generated_answer,
-                        "similarity_score": float(similarity_score)  # Convert numpy float to Python float
-                    }
-                    evaluation_results.append(result)
-
-                    # Update progress
-                    await db.evaluation_jobs.update_one(
-                        {"_id": job_id},
-                        {
-                            "$inc": {"processed_questions": 1},
-                            "$set": {"progress": (idx + 1) / total_questions}
-                        }
-                    )
-
-                except Exception as e:
-                    # Log error but continue with other questions
-                    print(f"Error processing question {idx + 1}: {str(e)}")
-                    await db.evaluation_jobs.update_one(
-                        {"_id": job_id},
-                        {"$push": {"errors": f"Error on question {idx + 1}: {str(e)}"}}
-                    )
-
-            # Calculate aggregate metrics
-            similarity_scores = [result["similarity_score"] for result in evaluation_results]
-            aggregate_metrics = {
-                "mean_similarity": float(np.mean(similarity_scores)),
-                "median_similarity": float(np.median(similarity_scores)),
-                "min_similarity": float(np.min(similarity_scores)),
-                "max_similarity": float(np.max(similarity_scores)),
-                "std_similarity": float(np.std(similarity_scores))
-            }
-
-            # Store final results
-            await db.evaluations.insert_one({
-                "agent_id": agent_id,
-                "job_id": job_id,
-                "timestamp": datetime.utcnow(),
-                "results": evaluation_results,
-                "aggregate_metrics": aggregate_metrics,
-                "status": "completed"
-            })
+            # Results are written per question as they are scored
+            runner = EvaluationRunner(db, job_id, agent_id, rag_chain, embeddings, cache)
+            errors = await runner.run(eval_data)
+            if errors:
+                await db.evaluation_jobs.update_one(
+                    {"_id": job_id},
+                    {"$push": {"errors": {"$each": errors}}}
+                )
+
+            aggregate_metrics = await compute_aggregate_metrics(db, job_id)
+            if aggregate_metrics is None:
+                raise ValueError("No question in the evaluation set could be answered")
+
+            await db.evaluations.update_one(
+                {"job_id": job_id},
+                {"$set": {"aggregate_metrics": aggregate_metrics, "status": "completed"}}
+            )
 
             # Update job status to completed
             await db.evaluation_jobs.update_one(
@@ -152,15 +123,10 @@ async def evaluate(
                 }
             )
 
-            await db.evaluations.insert_one({
-                "agent_id": agent_id,
-                "job_id": job_id,
-                "timestamp": datetime.utcnow(),
-                "results": evaluation_results,
-                "aggregate_metrics": aggregate_metrics,
-                "status": "failed",
-                "error": str(e)
-            })
+            await db.evaluations.update_one(
+                {"job_id": job_id},
+                {"$set": {"status": "failed", "error": str(e)}}
+            )
 
     # Start processing in background
     background_tasks.add_task(process_evaluation)
@@ -179,9 +145,52 @@ async def get_evaluation_status(
 @router.get("/{agent_id}/evaluations")
 async def get_agent_evaluations(
     agent_id: str,
+    limit: Optional[int] = None,
+    before: Optional[datetime] = None,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Evaluation summaries, newest first; page with `before` = last timestamp."""
+    query = {"agent_id": agent_id}
+    if before:
+        query["timestamp"] = {"$lt": before}
+    cursor = db.evaluations.find(
+        query, {'_id': False, 'results': False, 'stats': False}
+    ).sort("timestamp", -1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return await cursor.to_list(None)
+
+@router.get("/{agent_id}/evaluations/{job_id}/results")
+async def get_evaluation_results(
+    agent_id: str,
+    job_id: str,
+    cursor: int = -1,
+    limit: int = 100,
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    evaluations = await db.evaluations.find({"agent_id": agent_id}, {'_id': False}).sort("timestamp", -1).to_list(None)
-    if not evaluations:
-        return []
-    return evaluations
\ No newline at end of file
+    """Per-question results in question order; pass `next_cursor` back as
+    `cursor` for the next page."""
+    limit = max(1, min(limit, 1000))
+    evaluation = await db.evaluations.find_one({"agent_id": agent_id, "job_id": job_id}, {"_id": True})
+    if not evaluation:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+
+    results = await db.evaluation_results.find(
+        {"job_id": job_id, "index": {"$gt": cursor}},
+        {"_id": False, "job_id": False, "agent_id": False}
+    ).sort("index", 1).limit(limit).to_list(None)
+
+    if not results:
+        # Evaluations stored before per-question results embed them inline;
+        # page through the array with the same cursor
+        start = cursor + 1
+        legacy = await db.evaluations.find_one(
+            {"_id": evaluation["_id"]},
+            {"results": {"$slice": [start, limit]}}
+        )
+        results = [{"index": start + i, **result} for i, result in enumerate(legacy.get("results") or [])]
+
+    return {
+        "results": results,
+        "next_cursor": results[-1]["index"] if len(results) == limit else None
+    }
@@ -1,33 +1,72 @@
 # File: app/api/routes/metrics.py
 from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from bson import json_util
-import json
+from services.chain_registry import chain_registry
+from services.embeddings_service import embeddings_registry_stats, vector_store_stats
+from services.sql_service import sql_cache_stats
+from services.llm_service import llm_client_stats
+from services.llm_hedging import model_health
+from services.metrics_aggregator import ROLLUPS, metrics_aggregator, with_averages
+from services.stage_metrics import stage_metrics
 from ..dependencies import get_db
 
 router = APIRouter()
 
-class JSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, bytes):
-            return str(obj)
-        return json_util.default(obj)
-
 @router.get("/agent/{agent_id}")
 async def get_agent_metrics(
     agent_id: str,
     start_date: datetime,
     end_date: datetime,
+    granularity: Literal["hour", "day", "month"] = "day",
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
-    metrics = await db.metrics.find({
+    collection, truncate = ROLLUPS[granularity]
+    metrics = await db[collection].find({
         "agent_id": agent_id,
         "date": {
-            "$gte": start_date,
+            "$gte": truncate(start_date),
             "$lte": end_date
         }
-    }).to_list(None)
-    
-    return json.loads(json.dumps(metrics, cls=JSONEncoder))
+    }).sort("date", 1).to_list(None)
+
+    return [
+        {
+            **with_averages(item),
+            "_id": str(item["_id"]),
+            # Stored dates are naive UTC; mark them so clients do not read local time
+            "date": item["date"].isoformat() + "Z"
+        }
+        for item in metrics
+    ]
+
+
+@router.get("/cache")
+async def get_cache_stats():
+    return {
+        "chains": chain_registry.stats(),
+        "llm_clients": llm_client_stats(),
+        "embeddings": embeddings_registry_stats(),
+        "vector_stores": vector_store_stats(),
+        "sql": sql_cache_stats(),
+        "metrics": metrics_aggregator.stats()
+    }
+
+
+@router.get("/stages")
+async def get_stage_latencies(agent_id: Optional[str] = None):
+    """p50/p95/p99 latency of each chain stage since this process started."""
+    return stage_metrics.summary(agent_id)
+
+
+@router.get("/models")
+async def get_model_health():
+    """Time to first token, errors and hedging outcomes per LLM."""
+    return model_health.stats()
+
+
+@router.get("/prometheus", response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    return stage_metrics.render_prometheus()
@@ -1,21 +1,134 @@
 # File: app/config/settings.py
 from pathlib import Path
-from typing import Dict, Any
+from typing import Callable, Dict, Any, List, Optional
 import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 class Settings:
     UPLOAD_DIR: Path = Path("uploads")
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+    MAX_UPLOAD_FILE_BYTES: int = int(os.getenv("MAX_UPLOAD_FILE_BYTES", 200 * 1024 * 1024))
+    MAX_UPLOAD_REQUEST_BYTES: int = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", 1024 * 1024 * 1024))
+    ALLOWED_UPLOAD_EXTENSIONS: set = {"pdf", "docx", "doc"}
+    S3_MAX_POOL_CONNECTIONS: int = int(os.getenv("S3_MAX_POOL_CONNECTIONS", 16))
+    S3_DOWNLOAD_CONCURRENCY: int = int(os.getenv("S3_DOWNLOAD_CONCURRENCY", 8))
     MONGO_URI: str = os.getenv("MONGO_URI", "mongodb://localhost:27017")
     DB_NAME: str = "rag_db"
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv("MONGO_MAX_POOL_SIZE", 100))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000))
+    MONGO_SOCKET_TIMEOUT_MS: Optional[int] = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 0)) or None
+    MONGO_READ_PREFERENCE: str = os.getenv("MONGO_READ_PREFERENCE", "primary")
+    CHAIN_CACHE_SIZE: int = int(os.getenv("CHAIN_CACHE_SIZE", 256))
+    CHAIN_CACHE_TTL: float = float(os.getenv("CHAIN_CACHE_TTL", 3600))
+    CHROMA_PERSIST_DIRECTORY: str = os.getenv("CHROMA_PERSIST_DIRECTORY", "./db")
+    # Set to use a Chroma server instead of the embedded store in
+    # CHROMA_PERSIST_DIRECTORY; required when worker.py processes ingest
+    CHROMA_HOST: Optional[str] = os.getenv("CHROMA_HOST") or None
+    CHROMA_PORT: int = int(os.getenv("CHROMA_PORT", 8000))
+    CHROMA_COLLECTION_CACHE_SIZE: int = int(os.getenv("CHROMA_COLLECTION_CACHE_SIZE", 64))
+    SQL_EXECUTOR_WORKERS: int = int(os.getenv("SQL_EXECUTOR_WORKERS", 8))
+    SQL_ENGINE_CACHE_SIZE: int = int(os.getenv("SQL_ENGINE_CACHE_SIZE", 32))
+    SQL_POOL_SIZE: int = int(os.getenv("SQL_POOL_SIZE", 5))
+    SQL_MAX_OVERFLOW: int = int(os.getenv("SQL_MAX_OVERFLOW", 5))
+    SQL_POOL_RECYCLE: int = int(os.getenv("SQL_POOL_RECYCLE", 1800))
+    SQL_SCHEMA_CACHE_TTL: float = float(os.getenv("SQL_SCHEMA_CACHE_TTL", 600))
+    SQL_STATEMENT_TIMEOUT_MS: int = int(os.getenv("SQL_STATEMENT_TIMEOUT_MS", 15000))
+    SQL_MAX_ROWS: int = int(os.getenv("SQL_MAX_ROWS", 200))
+    SQL_MAX_RESULT_BYTES: int = int(os.getenv("SQL_MAX_RESULT_BYTES", 20000))
+    SQL_RESULT_CACHE_SIZE: int = int(os.getenv("SQL_RESULT_CACHE_SIZE", 512))
+    SQL_RESULT_CACHE_TTL: float = float(os.getenv("SQL_RESULT_CACHE_TTL", 60))
+    INGESTION_PARSE_WORKERS: int = int(os.getenv("INGESTION_PARSE_WORKERS", os.cpu_count() or 1))
+    INGESTION_PARSE_START_METHOD: str = os.getenv("INGESTION_PARSE_START_METHOD", "spawn")
+    INGESTION_BATCH_SIZE: int = int(os.getenv("INGESTION_BATCH_SIZE", 64))
+    EMBEDDINGS_MAX_CONCURRENCY: int = int(os.getenv("EMBEDDINGS_MAX_CONCURRENCY", 4))
+    EMBEDDINGS_MAX_RETRIES: int = int(os.getenv("EMBEDDINGS_MAX_RETRIES", 6))
+    EMBEDDINGS_BACKOFF_SECONDS: float = float(os.getenv("EMBEDDINGS_BACKOFF_SECONDS", 1.0))
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+    JOB_WORKER_CONCURRENCY: int = int(os.getenv("JOB_WORKER_CONCURRENCY", 2))
+    JOB_WORKERS_IN_API: int = int(os.getenv("JOB_WORKERS_IN_API", 1))
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", 60))
+    JOB_HEARTBEAT_SECONDS: float = float(os.getenv("JOB_HEARTBEAT_SECONDS", 15))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+    JOB_RETRY_BACKOFF_SECONDS: float = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", 30))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", 2))
+    EVALUATION_CONCURRENCY: int = int(os.getenv("EVALUATION_CONCURRENCY", 8))
+    EVALUATION_EMBED_BATCH_SIZE: int = int(os.getenv("EVALUATION_EMBED_BATCH_SIZE", 128))
+    EVALUATION_PROGRESS_INTERVAL: float = float(os.getenv("EVALUATION_PROGRESS_INTERVAL", 2.0))
+    EVALUATION_BATCH_FLUSH_INTERVAL: float = float(os.getenv("EVALUATION_BATCH_FLUSH_INTERVAL", 2.0))
+    EVALUATION_CACHE_TTL_DAYS: int = int(os.getenv("EVALUATION_CACHE_TTL_DAYS", 30))
+    MODELS_CONFIG_PATH: str = os.getenv("MODELS_CONFIG_PATH", "/app/backend/models_config.json")
+    MODELS_CONFIG_RELOAD_INTERVAL: float = float(os.getenv("MODELS_CONFIG_RELOAD_INTERVAL", 5))
+    LLM_CLIENT_CACHE_SIZE: int = int(os.getenv("LLM_CLIENT_CACHE_SIZE", 64))
+    LLM_CLIENT_IDLE_TTL: float = float(os.getenv("LLM_CLIENT_IDLE_TTL", 3600))
+    LLM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", 100))
+    LLM_HTTP_MAX_KEEPALIVE: int = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", 20))
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", 60))
+    LLM_HTTP_TIMEOUT: float = float(os.getenv("LLM_HTTP_TIMEOUT", 120))
+    LLM_FIRST_TOKEN_DEADLINE: float = float(os.getenv("LLM_FIRST_TOKEN_DEADLINE", 5))
+    LLM_FAILURE_THRESHOLD: int = int(os.getenv("LLM_FAILURE_THRESHOLD", 3))
+    LLM_FAILURE_COOLDOWN: float = float(os.getenv("LLM_FAILURE_COOLDOWN", 60))
+    CHAT_DISCONNECT_POLL_INTERVAL: float = float(os.getenv("CHAT_DISCONNECT_POLL_INTERVAL", 0.5))
+    METRICS_FLUSH_INTERVAL: float = float(os.getenv("METRICS_FLUSH_INTERVAL", 10))
+    EMBEDDINGS_CACHE_SIZE: int = int(os.getenv("EMBEDDINGS_CACHE_SIZE", 8))
+    EMBEDDINGS_IDLE_TTL: float = float(os.getenv("EMBEDDINGS_IDLE_TTL", 3600))
+    EMBEDDINGS_WARMUP_MODELS: list = [
+        m.strip() for m in os.getenv("EMBEDDINGS_WARMUP_MODELS", "").split(",") if m.strip()
+    ]
     
     @staticmethod
     def get_models_config() -> Dict[str, Any]:
-        with open('/app/backend/models_config.json', 'r') as f:
-            return json.load(f)
+        return models_config.get()
+
+class ModelsConfig:
+    """models_config.json loaded once and reloaded when the file changes.
+
+    The file's mtime is checked at most every `reload_interval` seconds. If
+    a reload fails (e.g. the file is mid-write) the previous config is kept.
+    """
+
+    def __init__(self, path: str, reload_interval: float):
+        self.path = path
+        self.reload_interval = reload_interval
+        self._config: Dict[str, Any] = {}
+        self._mtime: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    def on_change(self, listener: Callable[[], None]):
+        self._listeners.append(listener)
+
+    def get(self) -> Dict[str, Any]:
+        if time.monotonic() - self._checked_at >= self.reload_interval or self._mtime is None:
+            self._reload_if_changed()
+        return self._config
+
+    def _reload_if_changed(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime == self._mtime:
+                    return
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+            except Exception as e:
+                print(f"Error loading models config {self.path}: {str(e)}")
+                return
+            changed = self._mtime is not None
+            self._config, self._mtime = config, mtime
+        if changed:
+            print(f"Reloaded models config {self.path}")
+            for listener in self._listeners:
+                listener()
 
 settings = Settings()
+models_config = ModelsConfig(settings.MODELS_CONFIG_PATH, settings.MODELS_CONFIG_RELOAD_INTERVAL)
 print(settings.MONGO_URI)
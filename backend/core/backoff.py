@@ -0,0 +1,74 @@
+# File: app/core/backoff.py
+from typing import Optional
+import asyncio
+import random
+
+def error_status(error: Exception) -> Optional[int]:
+    """HTTP status carried by a provider SDK error, if any."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_rate_limited(error: Exception) -> bool:
+    if error_status(error) == 429:
+        return True
+    message = str(error).lower()
+    return "rate limit" in message or "resource_exhausted" in message or "429" in message
+
+def is_retryable(error: Exception) -> bool:
+    if is_rate_limited(error):
+        return True
+    status = error_status(error)
+    if status is not None:
+        return status >= 500
+    name = type(error).__name__
+    return isinstance(error, (TimeoutError, ConnectionError)) or "Timeout" in name or "Connection" in name
+
+def retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt: int, base: float, cap: float = 60.0, error: Optional[Exception] = None) -> float:
+    """Exponential backoff with jitter, honouring a Retry-After header."""
+    hinted = retry_after(error) if error else None
+    if hinted is not None:
+        return min(hinted, cap)
+    return min(cap, base * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+class AdaptiveConcurrency:
+    """AIMD limit on in-flight requests to a rate-limited provider.
+
+    The limit halves whenever the provider throttles us and grows back by
+    one after every `limit` consecutive successes, up to max_concurrency.
+    """
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def succeeded(self):
+        self._successes += 1
+        if self._successes >= self.limit and self.limit < self.max_concurrency:
+            self.limit += 1
+            self._successes = 0
+
+    def throttled(self):
+        self.limit = max(1, self.limit // 2)
+        self._successes = 0
@@ -0,0 +1,146 @@
+# File: app/core/cache.py
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import threading
+import time
+
+class TTLCache:
+    """Thread-safe LRU cache with an optional time-to-live per entry.
+
+    With sliding=True the TTL is measured from the last access rather than
+    from insertion, so it evicts idle entries instead of old ones.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 128,
+        ttl: Optional[float] = None,
+        on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+        sliding: bool = False
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.sliding = sliding
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._key_locks: Dict[Hashable, list] = {}  # key -> [lock, holders and waiters]
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.monotonic() - stored_at > self.ttl
+
+    def _evict(self, key: Hashable):
+        _, value = self._entries.pop(key)
+        self.evictions += 1
+        if self.on_evict:
+            try:
+                self.on_evict(key, value)
+            except Exception as e:
+                print(f"Error evicting cache entry {key}: {str(e)}")
+
+    def _lookup(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        if self._expired(entry[0]):
+            self._evict(key)
+            return _MISSING
+        self._entries.move_to_end(key)
+        if self.sliding:
+            self._entries[key] = (time.monotonic(), entry[1])
+        return entry[1]
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            if key in self._entries:
+                self._entries.pop(key)
+            self._entries[key] = (time.monotonic(), value)
+            while len(self._entries) > self.max_size:
+                self._evict(next(iter(self._entries)))
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached value, building it at most once per key.
+
+        The factory runs under a per-key lock so a slow build for one key
+        does not block lookups of other keys.
+        """
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                with self._lock:
+                    value = self._lookup(key)
+                if value is _MISSING:
+                    value = factory()
+                    self.set(key, value)
+                return value
+        finally:
+            # The lock is shared until its last waiter is done, so a caller
+            # arriving meanwhile queues on it instead of building in parallel
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._key_locks.pop(key, None)
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Look up a key without touching recency or hit counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(entry[0]):
+                return default
+            return entry[1]
+
+    def items(self):
+        with self._lock:
+            return [(key, entry[1]) for key, entry in self._entries.items()]
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            return entry[1] if entry else default
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drop every entry whose key matches predicate, returning the count."""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                self._entries.pop(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+_MISSING = object()
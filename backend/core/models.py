@@ -9,6 +9,7 @@ class S3Config(BaseModel):
     region_name: str
     aws_access_key: str
     aws_secret_key: str
+    endpoint_url: Optional[str] = None
 
 class EmbeddingsConfig(BaseModel):
     model: str
@@ -16,12 +17,17 @@ class EmbeddingsConfig(BaseModel):
     api_key: Optional[str]
     embedding_type: str
     huggingface_model: Optional[str]
+    batch_size: Optional[int] = None
+    max_concurrency: Optional[int] = None
 
 class SQLConfig(BaseModel):
     url: str
     username: str
     password: str
     db_name: str
+    statement_timeout_ms: Optional[int] = None
+    max_rows: Optional[int] = None
+    max_result_bytes: Optional[int] = None
 
 class LLMConfig(BaseModel):
     model: str
@@ -38,6 +44,9 @@ class RAGConfig(BaseModel):
     contextualization_prompt: Optional[str] = None
     temperature: Optional[float] = None
     advancedLLMConfig: Optional[LLMConfig] = None
+    # Models from models_config.json to hedge to when the primary is slow
+    fallback_llms: Optional[List[str]] = None
+    first_token_deadline: Optional[float] = None
     advancedEmbeddingsConfig: Optional[EmbeddingsConfig] = None
     sql_config: Optional[SQLConfig] = None 
     s3_config: Optional[S3Config] = None
@@ -56,6 +65,9 @@ class ChatRequest(BaseModel):
     agent_id: str
     messages: List[Message]
 
+class S3IngestRequest(BaseModel):
+    prefix: str = ""
+
 class JobStatus(BaseModel):
     id: str
     status: str
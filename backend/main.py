@@ -1,25 +1,79 @@
 # File: app/main.py
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from api.routes import agents, chat, documents, metrics, users, evaluation
+from api.dependencies import connect_db, close_db
+from api.middleware import UploadLimitMiddleware
+from config.settings import settings
+from services.embeddings_service import warm_embeddings
+from services.sql_service import shutdown_sql_executor
+from services.llm_service import close_llm_clients
+from services.ingestion_pipeline import shutdown_process_pool
+from services.ingestion_jobs import JOB_HANDLERS
+from services.job_queue import JobWorker
+from services.ingestion_index import IngestionIndex
+from services.evaluation_service import ensure_evaluation_indexes
+from services.evaluation_cache import ensure_evaluation_cache_indexes
+from services.metrics_aggregator import ensure_metrics_indexes, metrics_aggregator
 from config.firebase import initialize_firebase
 import os
+import asyncio
 from dotenv import load_dotenv
 
 # Initialize Firebase Admin SDK
 load_dotenv('.backend.env')
 initialize_firebase()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    client = connect_db()
+    await IngestionIndex(client[settings.DB_NAME]).ensure_indexes()
+    await ensure_evaluation_indexes(client[settings.DB_NAME])
+    await ensure_evaluation_cache_indexes(client[settings.DB_NAME])
+    await ensure_metrics_indexes(client[settings.DB_NAME])
+    if settings.EMBEDDINGS_WARMUP_MODELS:
+        await asyncio.to_thread(warm_embeddings, settings.EMBEDDINGS_WARMUP_MODELS)
+
+    metrics_aggregator.start(client[settings.DB_NAME])
+
+    # Set JOB_WORKERS_IN_API=0 when ingestion runs in separate worker.py processes
+    job_worker = None
+    if settings.JOB_WORKERS_IN_API == 0 and not settings.CHROMA_HOST:
+        print("JOB_WORKERS_IN_API=0 without CHROMA_HOST: documents ingested by worker.py "
+              "will not be visible to this process")
+    if settings.JOB_WORKERS_IN_API > 0:
+        job_worker = JobWorker(client[settings.DB_NAME], JOB_HANDLERS, settings.JOB_WORKERS_IN_API)
+        job_worker_task = asyncio.create_task(job_worker.run())
+    yield
+    if job_worker:
+        job_worker.stop()
+        await job_worker_task
+    await metrics_aggregator.stop()
+    shutdown_sql_executor()
+    await close_llm_clients()
+    shutdown_process_pool()
+    close_db()
+
 app = FastAPI(
     title="RAG Chat API",
     description="Enhanced RAG API with agent management and metrics tracking",
     version="2.0.0",
     docs_url="/",
+    lifespan=lifespan,
 )
 
 url = os.environ.get('FRONTEND_URL', 'http://localhost:3000')
 print(f'link: {url}')
 
+# Bounds POST /api/agents/{agent_id}/documents[/bulk] before the body is
+# parsed. Added before CORS so that wraps it and 413s carry CORS headers.
+app.add_middleware(
+    UploadLimitMiddleware,
+    max_bytes=settings.MAX_UPLOAD_REQUEST_BYTES,
+    path_suffixes=("/documents", "/documents/bulk")
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[url, "http://localhost:5173", "https://ragui.duckgpt.tech", "http://172.18.0.4:3000/"],
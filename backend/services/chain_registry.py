@@ -0,0 +1,42 @@
+# File: app/services/chain_registry.py
+from typing import Any, Callable, Dict, Optional
+import hashlib
+from core.cache import TTLCache
+from core.models import RAGConfig
+from config.settings import settings, models_config
+
+def config_fingerprint(config: RAGConfig) -> str:
+    return hashlib.sha256(config.model_dump_json().encode()).hexdigest()
+
+class ChainRegistry:
+    """Process-wide cache of compiled chains keyed by agent id and config hash.
+
+    Chains are stateless runnables, so one compiled chain can serve every
+    concurrent request for the same agent configuration.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float]):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get_or_build(
+        self,
+        agent_id: str,
+        config: RAGConfig,
+        builder: Callable[[], Any],
+        chain_type: Optional[str] = None
+    ):
+        key = (agent_id, config_fingerprint(config), chain_type)
+        return self._cache.get_or_create(key, builder)
+
+    def invalidate(self, agent_id: str) -> int:
+        return self._cache.invalidate(lambda key: key[0] == agent_id)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+chain_registry = ChainRegistry(settings.CHAIN_CACHE_SIZE, settings.CHAIN_CACHE_TTL)
+# Compiled chains hold the LLM client built from models_config.json
+models_config.on_change(chain_registry.clear)
@@ -1,48 +1,96 @@
 # File: app/services/document_service.py
 from pathlib import Path
-from typing import BinaryIO
-from langchain_community.document_loaders import PyPDFLoader, UnstructuredWordDocumentLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import BinaryIO, Optional
+import asyncio
+import tempfile
+import uuid
 from .embeddings_service import EmbeddingsService
+from .ingestion_index import IngestionIndex, hash_file
+from .ingestion_pipeline import IngestionPipeline
 from .storage_service import StorageService
 
 class DocumentService:
     def __init__(
         self,
         embeddings_service: EmbeddingsService,
-        storage_service: StorageService
+        storage_service: StorageService,
+        ingestion_index: Optional[IngestionIndex] = None
     ):
         self.embeddings_service = embeddings_service
         self.storage_service = storage_service
+        self.ingestion_index = ingestion_index
 
     async def process_document(
         self,
         file_path: Path,
         collection_name: str,
-        file_type: str
+        file_type: str,
+        source: Optional[str] = None,
+        file_hash: Optional[str] = None,
+        document_id: Optional[str] = None,
+        replace_by_source: bool = False
     ):
+        """Ingest one file, skipping it when identical content is already indexed.
+
+        `source` names the document inside the collection (the name or
+        relative path sent by the client for uploads, the object key for S3).
+        Passing `document_id`, or `replace_by_source` when a document with the
+        same source exists, replaces that document's vectors in place,
+        embedding only new chunks and removing chunks that disappeared;
+        otherwise new content becomes a new document.
+        """
         try:
-            if file_type == 'pdf':
-                loader = PyPDFLoader(str(file_path))
-            elif file_type in ['docx', 'doc']:
-                loader = UnstructuredWordDocumentLoader(str(file_path))
-            else:
-                raise ValueError("Unsupported file type")
+            source = source or file_path.name
+            previous = None
+            if self.ingestion_index:
+                file_hash = file_hash or await asyncio.to_thread(hash_file, str(file_path))
+                if document_id:
+                    previous = await self.ingestion_index.get_by_id(collection_name, document_id)
+                    if not previous:
+                        raise ValueError(f"Document {document_id} not found")
+                elif replace_by_source:
+                    previous = await self.ingestion_index.get_by_source(collection_name, source)
+                if previous:
+                    if previous["file_hash"] == file_hash:
+                        return {"skipped": True}
+                    document_id = previous["document_id"]
+                elif await self.ingestion_index.find_by_hash(collection_name, file_hash):
+                    print(f"Skipped {source}: identical content already ingested into {collection_name}")
+                    return {"skipped": True}
+            # Bare upload file names can collide across folders, so without a
+            # match on a trusted source new content becomes a new document
+            document_id = document_id or str(uuid.uuid4())
 
-            docs = loader.load()
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200
+            pipeline = IngestionPipeline(
+                self.embeddings_service.get_embeddings(),
+                self.embeddings_service.get_vector_store(collection_name),
+                batch_size=self.embeddings_service.batch_size(),
+                max_concurrency=self.embeddings_service.max_concurrency()
             )
-            splits = text_splitter.split_documents(docs)
-            
-            vector_store = self.embeddings_service.get_vector_store(collection_name)
-            vector_store.add_documents(splits)
-            
-            return True
+            stats, chunk_ids = await pipeline.run(
+                str(file_path),
+                file_type,
+                document_id,
+                source,
+                previous["chunk_ids"] if previous else None
+            )
+            if self.ingestion_index:
+                await self.ingestion_index.record(collection_name, document_id, source, file_hash, chunk_ids)
+            print(f"Ingested {source} into {collection_name}: {stats.as_dict()}")
+            return {**stats.as_dict(), "document_id": document_id}
         except Exception as e:
             raise Exception(f"Error processing document: {str(e)}")
 
+    async def delete_document(self, collection_name: str, document_id: str) -> bool:
+        document = await self.ingestion_index.get_by_id(collection_name, document_id)
+        if not document:
+            return False
+        vector_store = self.embeddings_service.get_vector_store(collection_name)
+        if document["chunk_ids"]:
+            await asyncio.to_thread(vector_store._collection.delete, ids=document["chunk_ids"])
+        await self.ingestion_index.remove(collection_name, document_id)
+        return True
+
     async def process_s3_document(
         self,
         file_key: str,
@@ -50,9 +98,16 @@ class DocumentService:
         file_type: str
     ):
         try:
-            file_content = await self.storage_service.download_from_s3(file_key)
-            # Process the file content similarly to local files
-            # Implementation depends on how you want to handle S3 files
-            return True
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                file_path = Path(tmp_dir) / f"{uuid.uuid4()}.{file_type}"
+                saved = await asyncio.to_thread(self.storage_service.download_to_file, file_key, str(file_path))
+                return await self.process_document(
+                    file_path,
+                    collection_name,
+                    file_type,
+                    source=file_key,
+                    file_hash=saved["sha256"],
+                    replace_by_source=True
+                )
         except Exception as e:
             raise Exception(f"Error processing S3 document: {str(e)}")
@@ -2,31 +2,106 @@
 from langchain_openai import OpenAIEmbeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_chroma import Chroma
+import chromadb
+import hashlib
+import threading
+from core.cache import TTLCache
 from core.models import EmbeddingsConfig
-from typing import Optional
+from config.settings import settings
+from typing import List, Optional
 import os
 
+# Embedding clients and locally loaded models shared by every request in the
+# process, keyed by (type, model, base_url, api_key). Idle models are evicted
+# so rarely used HuggingFace weights do not stay resident forever.
+_embeddings_registry = TTLCache(
+    max_size=settings.EMBEDDINGS_CACHE_SIZE,
+    ttl=settings.EMBEDDINGS_IDLE_TTL,
+    sliding=True
+)
+
+# One persistent Chroma client per process. Chroma keeps the HNSW segments of
+# collections it has opened in memory, so reusing the client and collection
+# handles avoids reloading the index on every query.
+_chroma_client = None
+_chroma_client_lock = threading.Lock()
+_vector_stores = TTLCache(max_size=settings.CHROMA_COLLECTION_CACHE_SIZE)
+
+def get_chroma_client():
+    global _chroma_client
+    with _chroma_client_lock:
+        if _chroma_client is None:
+            # The embedded store supports a single process only; API and
+            # standalone workers share a Chroma server instead
+            if settings.CHROMA_HOST:
+                _chroma_client = chromadb.HttpClient(host=settings.CHROMA_HOST, port=settings.CHROMA_PORT)
+            else:
+                _chroma_client = chromadb.PersistentClient(path=settings.CHROMA_PERSIST_DIRECTORY)
+        return _chroma_client
+
+def _embeddings_key(config: Optional[EmbeddingsConfig]):
+    if not config:
+        return ("openai", None, 'https://api.xty.app/v1', os.getenv("EMBEDDINGS_API_KEY"))
+    if config.embedding_type.lower() == 'huggingface':
+        return ("huggingface", config.huggingface_model, None, None)
+    return ("openai", config.model, config.base_url, config.api_key)
+
+def _create_embeddings(key):
+    embedding_type, model, base_url, api_key = key
+    if embedding_type == "huggingface":
+        return HuggingFaceEmbeddings(model_name=model)
+    if model is None:
+        return OpenAIEmbeddings(base_url=base_url, api_key=api_key)
+    return OpenAIEmbeddings(model=model, base_url=base_url, api_key=api_key)
+
+def warm_embeddings(huggingface_models: List[str]):
+    """Load HuggingFace models ahead of the first request that needs them."""
+    for model_name in huggingface_models:
+        key = ("huggingface", model_name, None, None)
+        _embeddings_registry.get_or_create(key, lambda: _create_embeddings(key))
+        print(f"Warmed embeddings model {model_name}")
+
+def embeddings_registry_stats():
+    return _embeddings_registry.stats()
+
+def vector_store_stats():
+    return _vector_stores.stats()
+
 class EmbeddingsService:
     def __init__(self, config: Optional[EmbeddingsConfig] = None):
         self.config = config
 
     def get_embeddings(self):
-        if not self.config:
-            return OpenAIEmbeddings(
-                base_url='https://api.xty.app/v1',
-                api_key=os.getenv("EMBEDDINGS_API_KEY")
-            )
-        print(self.config)
-
-        if self.config.embedding_type.lower() == 'huggingface':
-            return HuggingFaceEmbeddings(model_name=self.config.huggingface_model)
-        
-        return OpenAIEmbeddings(
-            model=self.config.model,
-            base_url=self.config.base_url,
-            api_key=self.config.api_key
-        )
+        key = _embeddings_key(self.config)
+        return _embeddings_registry.get_or_create(key, lambda: _create_embeddings(key))
+
+    def fingerprint(self) -> str:
+        """Identifies the embedding model (not the credentials) so stored
+        vectors can be reused across agents and runs."""
+        embedding_type, model, base_url, _ = _embeddings_key(self.config)
+        return hashlib.sha256(f"{embedding_type}\0{model}\0{base_url}".encode()).hexdigest()
+
+    def batch_size(self) -> int:
+        if self.config and self.config.batch_size:
+            return self.config.batch_size
+        return settings.INGESTION_BATCH_SIZE
+
+    def max_concurrency(self) -> int:
+        if self.config and self.config.max_concurrency:
+            return self.config.max_concurrency
+        # Local models are CPU bound; parallel batches only contend for cores
+        if self.config and self.config.embedding_type.lower() == 'huggingface':
+            return 1
+        return settings.EMBEDDINGS_MAX_CONCURRENCY
 
     def get_vector_store(self, collection_name: str):
-        embeddings = self.get_embeddings()
-        return Chroma(collection_name, embedding_function=embeddings, persist_directory='./db')
+        """Collection handle without an embedding function.
+
+        Callers embed through get_embeddings() and query or write vectors
+        directly, so the cached handle never pins an embeddings model that
+        the registry has evicted.
+        """
+        return _vector_stores.get_or_create(collection_name, lambda: Chroma(
+            collection_name,
+            client=get_chroma_client()
+        ))
@@ -0,0 +1,89 @@
+# File: app/services/evaluation_cache.py
+from datetime import datetime
+from typing import Dict, List
+import asyncio
+import hashlib
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import OperationFailure
+from config.settings import settings
+
+INDEX_OPTIONS_CONFLICT = 85
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+async def ensure_evaluation_cache_indexes(db: AsyncIOMotorDatabase):
+    ttl = settings.EVALUATION_CACHE_TTL_DAYS * 24 * 3600
+    for collection in (db.evaluation_answer_cache, db.embedding_cache):
+        await collection.create_index("key", unique=True)
+        try:
+            await collection.create_index("created_at", expireAfterSeconds=ttl)
+        except OperationFailure as e:
+            if e.code != INDEX_OPTIONS_CONFLICT:
+                raise
+            # EVALUATION_CACHE_TTL_DAYS changed since the index was built
+            await db.command(
+                "collMod",
+                collection.name,
+                index={"keyPattern": {"created_at": 1}, "expireAfterSeconds": ttl}
+            )
+
+class EvaluationCache:
+    """Reuses generated answers and embeddings across evaluation runs.
+
+    An answer is keyed by the agent config fingerprint, the collection
+    version and the question, so it is only reused when neither the agent
+    nor the documents it retrieves from have changed. Embeddings are keyed
+    by the embedding model fingerprint and the text.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        config_fingerprint: str,
+        collection_version: int,
+        embeddings_fingerprint: str
+    ):
+        self.answers = db.evaluation_answer_cache
+        self.vectors = db.embedding_cache
+        self.config_fingerprint = config_fingerprint
+        self.collection_version = str(collection_version)
+        self.embeddings_fingerprint = embeddings_fingerprint
+
+    def _answer_key(self, question: str) -> str:
+        return _hash(self.config_fingerprint, self.collection_version, question)
+
+    def _vector_key(self, text: str) -> str:
+        return _hash(self.embeddings_fingerprint, text)
+
+    async def get_answers(self, questions: List[str]) -> Dict[str, str]:
+        keys = {self._answer_key(question): question for question in questions}
+        cached = await self.answers.find({"key": {"$in": list(keys)}}).to_list(None)
+        return {keys[item["key"]]: item["answer"] for item in cached}
+
+    async def store_answer(self, question: str, answer: str):
+        await self.answers.update_one(
+            {"key": self._answer_key(question)},
+            {"$set": {"answer": answer, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def embed(self, texts: List[str], embeddings) -> List[List[float]]:
+        """Embed texts, calling the model only for texts not seen before."""
+        keys = [self._vector_key(text) for text in texts]
+        cached = await self.vectors.find({"key": {"$in": list(set(keys))}}).to_list(None)
+        vectors = {item["key"]: item["vector"] for item in cached}
+
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            computed = await asyncio.to_thread(embeddings.embed_documents, list(missing.values()))
+            now = datetime.utcnow()
+            for key, vector in zip(missing, computed):
+                vectors[key] = list(vector)
+            await self.vectors.bulk_write([
+                UpdateOne({"key": key}, {"$set": {"vector": vectors[key], "created_at": now}}, upsert=True)
+                for key in missing
+            ], ordered=False)
+
+        return [vectors[key] for key in keys]
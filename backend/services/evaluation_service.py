@@ -0,0 +1,195 @@
+# File: app/services/evaluation_service.py
+from typing import Any, Dict, List, Optional
+import asyncio
+import math
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+from config.settings import settings
+from .evaluation_cache import EvaluationCache
+
+def cosine_similarities(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity between two equally shaped matrices."""
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return np.einsum("ij,ij->i", a, b) / np.where(norms == 0, 1.0, norms)
+
+async def ensure_evaluation_indexes(db: AsyncIOMotorDatabase):
+    await db.evaluations.create_index([("agent_id", ASCENDING), ("timestamp", DESCENDING)])
+    await db.evaluation_results.create_index([("job_id", ASCENDING), ("index", ASCENDING)], unique=True)
+    await db.evaluation_results.create_index([("job_id", ASCENDING), ("similarity_score", ASCENDING)])
+
+async def compute_aggregate_metrics(db: AsyncIOMotorDatabase, job_id: str) -> Optional[Dict[str, float]]:
+    """Derive the summary metrics from the running totals kept on the
+    evaluation; only the median needs to look at stored results."""
+    evaluation = await db.evaluations.find_one({"job_id": job_id}, {"stats": True})
+    stats = (evaluation or {}).get("stats") or {}
+    count = stats.get("count", 0)
+    if not count:
+        return None
+
+    mean = stats["sum"] / count
+    middle = await db.evaluation_results.find(
+        {"job_id": job_id}, {"similarity_score": True}
+    ).sort("similarity_score", ASCENDING).skip((count - 1) // 2).limit(2 - count % 2).to_list(None)
+    return {
+        "mean_similarity": mean,
+        "median_similarity": float(np.mean([item["similarity_score"] for item in middle])),
+        "min_similarity": stats["min"],
+        "max_similarity": stats["max"],
+        "std_similarity": math.sqrt(max(stats["sum_sq"] / count - mean ** 2, 0.0))
+    }
+
+class EvaluationRunner:
+    """Answers an evaluation set concurrently and scores it in batches.
+
+    Questions go through the chain with at most EVALUATION_CONCURRENCY in
+    flight. Answers are scored as they arrive: each batch of reference and
+    generated answers is embedded with one embed_documents call off the
+    event loop, its similarities are computed in one NumPy pass, and the
+    scored items are written to `evaluation_results` together with running
+    totals on the evaluation. A partial batch is flushed after
+    EVALUATION_BATCH_FLUSH_INTERVAL seconds without new answers. Job
+    progress is written separately, at most once per
+    EVALUATION_PROGRESS_INTERVAL seconds.
+
+    With a cache, answers for unchanged questions and previously computed
+    embeddings are reused, so a rerun only calls the LLM for new or
+    affected items.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        job_id: str,
+        agent_id: str,
+        rag_chain,
+        embeddings,
+        cache: Optional[EvaluationCache] = None,
+        concurrency: int = settings.EVALUATION_CONCURRENCY,
+        embed_batch_size: int = settings.EVALUATION_EMBED_BATCH_SIZE
+    ):
+        self.db = db
+        self.job_id = job_id
+        self.agent_id = agent_id
+        self.rag_chain = rag_chain
+        self.embeddings = embeddings
+        self.cache = cache
+        self.concurrency = concurrency
+        self.embed_batch_size = embed_batch_size
+        self._processed = 0
+        self._reused = 0
+
+    async def run(self, eval_data: List[Dict[str, Any]]) -> List[str]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        answered: asyncio.Queue = asyncio.Queue(maxsize=self.embed_batch_size * 2)
+        errors: List[str] = []
+        cached_answers = {}
+        if self.cache:
+            cached_answers = await self.cache.get_answers([qa_pair["question"] for qa_pair in eval_data])
+
+        async def answer(idx: int, qa_pair: Dict[str, Any]):
+            try:
+                await answer_one(idx, qa_pair)
+            finally:
+                self._processed += 1
+
+        async def answer_one(idx: int, qa_pair: Dict[str, Any]):
+            generated_answer = cached_answers.get(qa_pair["question"])
+            if generated_answer is not None:
+                self._reused += 1
+            if generated_answer is None:
+                async with semaphore:
+                    try:
+                        response = await self.rag_chain.ainvoke({
+                            "input": qa_pair["question"],
+                            "chat_history": []
+                        })
+                    except Exception as e:
+                        print(f"Error processing question {idx + 1}: {str(e)}")
+                        errors.append(f"Error on question {idx + 1}: {str(e)}")
+                        return
+                generated_answer = response.get("answer", "")
+                if self.cache:
+                    await self.cache.store_answer(qa_pair["question"], generated_answer)
+            await answered.put({
+                "index": idx,
+                "question": qa_pair["question"],
+                "original_answer": qa_pair["answer"],
+                "generated_answer": generated_answer,
+                "cached": qa_pair["question"] in cached_answers
+            })
+
+        async def answer_all():
+            await asyncio.gather(*(answer(idx, qa_pair) for idx, qa_pair in enumerate(eval_data)))
+            await answered.put(None)
+
+        async def score_all():
+            finished = False
+            while not finished:
+                item = await answered.get()
+                if item is None:
+                    break
+                batch = [item]
+                while len(batch) < self.embed_batch_size:
+                    try:
+                        item = await asyncio.wait_for(answered.get(), timeout=settings.EVALUATION_BATCH_FLUSH_INTERVAL)
+                    except asyncio.TimeoutError:
+                        break
+                    if item is None:
+                        finished = True
+                        break
+                    batch.append(item)
+                await self._score_and_store(batch)
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(settings.EVALUATION_PROGRESS_INTERVAL)
+                await self._write_progress(len(eval_data))
+
+        async with asyncio.TaskGroup() as group:
+            group.create_task(answer_all())
+            scoring = group.create_task(score_all())
+            reporter = group.create_task(report_progress())
+            await scoring
+            reporter.cancel()
+        await self._write_progress(len(eval_data))
+
+        return errors
+
+    async def _write_progress(self, total: int):
+        await self.db.evaluation_jobs.update_one(
+            {"_id": self.job_id},
+            {"$set": {
+                "processed_questions": self._processed,
+                "progress": self._processed / total if total else 1.0,
+                "reused_answers": self._reused
+            }}
+        )
+
+    async def _score_and_store(self, batch: List[Dict[str, Any]]):
+        texts = [item["original_answer"] for item in batch] + [item["generated_answer"] for item in batch]
+        if self.cache:
+            vectors = await self.cache.embed(texts, self.embeddings)
+        else:
+            vectors = await asyncio.to_thread(self.embeddings.embed_documents, texts)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scores = cosine_similarities(vectors[:len(batch)], vectors[len(batch):])
+
+        for item, score in zip(batch, scores):
+            item.update({"job_id": self.job_id, "agent_id": self.agent_id, "similarity_score": float(score)})
+        await self.db.evaluation_results.insert_many(batch)
+
+        scores = [item["similarity_score"] for item in batch]
+        await self.db.evaluations.update_one(
+            {"job_id": self.job_id},
+            {
+                "$inc": {
+                    "stats.count": len(scores),
+                    "stats.sum": float(np.sum(scores)),
+                    "stats.sum_sq": float(np.sum(np.square(scores)))
+                },
+                "$min": {"stats.min": min(scores)},
+                "$max": {"stats.max": max(scores)}
+            }
+        )
+
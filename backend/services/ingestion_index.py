@@ -0,0 +1,87 @@
+# File: app/services/ingestion_index.py
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import hashlib
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, DESCENDING
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def chunk_id(document_id: str, text: str, occurrence: int) -> str:
+    """Stable vector id for a chunk: the same text occurring in the same
+    document always maps to the same id, across re-ingestions."""
+    return hashlib.sha256(f"{document_id}\0{occurrence}\0{text}".encode()).hexdigest()
+
+class IngestionIndex:
+    """Content-addressed record of what has been ingested into each collection.
+
+    One record per document holds its stable document id, the source name
+    and hash of the file last ingested for it, and the vector ids of its
+    chunks.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.index = db.ingestion_index
+        self.versions = db.collection_versions
+
+    async def get_version(self, collection: str) -> int:
+        """Counter bumped on every change to a collection's contents."""
+        version = await self.versions.find_one({"collection": collection})
+        return version["version"] if version else 0
+
+    async def bump_version(self, collection: str):
+        await self.versions.update_one(
+            {"collection": collection},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def ensure_indexes(self):
+        await self.index.create_index([("collection", ASCENDING), ("document_id", ASCENDING)], unique=True)
+        await self.index.create_index([("collection", ASCENDING), ("source", ASCENDING)])
+        await self.index.create_index([("collection", ASCENDING), ("file_hash", ASCENDING)])
+        await self.versions.create_index("collection", unique=True)
+
+    async def get_by_id(self, collection: str, document_id: str) -> Optional[Dict[str, Any]]:
+        return await self.index.find_one({"collection": collection, "document_id": document_id})
+
+    async def list(self, collection: str) -> List[Dict[str, Any]]:
+        return await self.index.find(
+            {"collection": collection},
+            {"_id": False, "chunk_ids": False}
+        ).sort("source", ASCENDING).to_list(None)
+
+    async def remove(self, collection: str, document_id: str):
+        await self.index.delete_one({"collection": collection, "document_id": document_id})
+        await self.bump_version(collection)
+
+    async def get_by_source(self, collection: str, source: str) -> Optional[Dict[str, Any]]:
+        return await self.index.find_one(
+            {"collection": collection, "source": source},
+            sort=[("ingested_at", DESCENDING)]
+        )
+
+    async def find_by_hash(self, collection: str, file_hash: str) -> Optional[Dict[str, Any]]:
+        return await self.index.find_one({"collection": collection, "file_hash": file_hash})
+
+    async def record(self, collection: str, document_id: str, source: str, file_hash: str, chunk_ids: List[str]):
+        await self.index.update_one(
+            {"collection": collection, "document_id": document_id},
+            {"$set": {
+                "source": source,
+                "file_hash": file_hash,
+                "chunk_ids": chunk_ids,
+                "chunk_count": len(chunk_ids),
+                "ingested_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+        await self.bump_version(collection)
@@ -0,0 +1,221 @@
+# File: app/services/ingestion_jobs.py
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Tuple
+import asyncio
+import os
+import tempfile
+import uuid
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from core.models import RAGConfig
+from config.settings import settings
+from .document_service import DocumentService
+from .embeddings_service import EmbeddingsService
+from .ingestion_index import IngestionIndex
+from .job_queue import JobQueue, RetryableJobError
+from .storage_service import StorageService
+
+INGEST_FILES = "ingest_files"
+INGEST_S3 = "ingest_s3"
+
+async def enqueue_ingestion(db: AsyncIOMotorDatabase, agent_id: str, files: List[Dict[str, Any]], errors: List[str] = None) -> str:
+    """Queue saved upload files for ingestion.
+
+    Each entry needs `path`, `extension` and `original_name`; the path must
+    be readable by whichever worker process leases the job. Entries with
+    `replace_by_source` replace the document ingested under the same
+    `original_name` instead of adding a new one.
+    """
+    return await JobQueue(db).enqueue(
+        INGEST_FILES,
+        agent_id=agent_id,
+        files=[{**file_info, "path": str(Path(file_info["path"]).resolve()), "status": "pending"} for file_info in files],
+        total_files=len(files) + len(errors or []),
+        processed_files=0,
+        errors=errors or [],
+        file_stats=[]
+    )
+
+async def enqueue_s3_ingestion(db: AsyncIOMotorDatabase, agent_id: str, prefix: str) -> str:
+    """Queue ingestion of every supported object under an S3 prefix."""
+    return await JobQueue(db).enqueue(
+        INGEST_S3,
+        agent_id=agent_id,
+        prefix=prefix,
+        files=None,
+        total_files=0,
+        processed_files=0,
+        errors=[],
+        file_stats=[]
+    )
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+def _pending_files(job: Dict[str, Any]):
+    for index, file_info in enumerate(job["files"]):
+        if file_info["status"] == "pending":
+            yield index, file_info
+
+async def _local_files(job: Dict[str, Any]) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    for index, file_info in _pending_files(job):
+        yield index, file_info
+
+async def _s3_files(job: Dict[str, Any], storage_service: StorageService, tmp_dir: str) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+    """Download pending objects concurrently and yield them as they land.
+
+    At most S3_DOWNLOAD_CONCURRENCY downloads run at once and at most as
+    many finished files wait for ingestion, which bounds temporary disk use.
+    """
+    pending: asyncio.Queue = asyncio.Queue()
+    for item in _pending_files(job):
+        pending.put_nowait(item)
+    total = pending.qsize()
+    downloaded: asyncio.Queue = asyncio.Queue(maxsize=settings.S3_DOWNLOAD_CONCURRENCY)
+
+    async def download():
+        while not pending.empty():
+            index, file_info = pending.get_nowait()
+            path = os.path.join(tmp_dir, f"{uuid.uuid4()}.{file_info['extension']}")
+            # Object keys are unique, so a changed object replaces the
+            # document ingested from the same key
+            file_info = {**file_info, "path": path, "temporary": True, "replace_by_source": True}
+            try:
+                saved = await asyncio.to_thread(storage_service.download_to_file, file_info["key"], path)
+                file_info.update(saved)
+            except Exception as e:
+                file_info["download_error"] = str(e)
+            await downloaded.put((index, file_info))
+
+    workers = [asyncio.create_task(download()) for _ in range(settings.S3_DOWNLOAD_CONCURRENCY)]
+    try:
+        for _ in range(total):
+            yield await downloaded.get()
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+async def _ingest_files(
+    db: AsyncIOMotorDatabase,
+    job: Dict[str, Any],
+    document_service: DocumentService,
+    collection: str,
+    files: AsyncIterator[Tuple[int, Dict[str, Any]]]
+) -> str:
+    """Ingest every pending file of a job.
+
+    Files that fail are left pending and the job is retried; on the final
+    attempt they are recorded as errors instead. Completed files are never
+    processed twice, so a retried or resumed job picks up where it stopped.
+    """
+    final_attempt = job["attempts"] >= job["max_attempts"]
+    processed_files = job["processed_files"]
+    retry_errors = []
+
+    async for index, file_info in files:
+        try:
+            if "download_error" in file_info:
+                raise Exception(file_info["download_error"])
+            stats = await document_service.process_document(
+                Path(file_info["path"]),
+                collection,
+                file_info["extension"],
+                source=file_info["original_name"],
+                file_hash=file_info.get("sha256"),
+                document_id=file_info.get("document_id"),
+                replace_by_source=file_info.get("replace_by_source", False)
+            )
+        except Exception as e:
+            error_message = f"Error processing {file_info['original_name']}: {str(e)}"
+            if not final_attempt:
+                if file_info.get("temporary"):
+                    _remove(file_info["path"])
+                retry_errors.append(error_message)
+                continue
+            _remove(file_info["path"])
+            await db.jobs.update_one(
+                {"_id": job["_id"]},
+                {
+                    "$set": {f"files.{index}.status": "failed"},
+                    "$push": {"errors": error_message}
+                }
+            )
+            continue
+
+        _remove(file_info["path"])
+        processed_files += 1
+        await db.jobs.update_one(
+            {"_id": job["_id"]},
+            {
+                "$set": {
+                    f"files.{index}.status": "done",
+                    "progress": processed_files / job["total_files"]
+                },
+                "$inc": {"processed_files": 1},
+                "$push": {"file_stats": {"file": file_info["original_name"], "stats": stats}}
+            }
+        )
+
+    if retry_errors:
+        raise RetryableJobError("; ".join(retry_errors))
+
+    return "completed" if processed_files == job["total_files"] else "completed_with_errors"
+
+async def _load_agent_services(db: AsyncIOMotorDatabase, job: Dict[str, Any]) -> Tuple[RAGConfig, DocumentService]:
+    agent = await db.agents.find_one({"id": job["agent_id"]})
+    if not agent:
+        raise ValueError("Agent not found")
+
+    rag_config = RAGConfig(**agent["config"])
+    document_service = DocumentService(
+        EmbeddingsService(rag_config.advancedEmbeddingsConfig),
+        StorageService(rag_config.s3_config),
+        IngestionIndex(db)
+    )
+    return rag_config, document_service
+
+async def process_ingestion_job(db: AsyncIOMotorDatabase, job: Dict[str, Any]) -> str:
+    rag_config, document_service = await _load_agent_services(db, job)
+    return await _ingest_files(db, job, document_service, rag_config.collection, _local_files(job))
+
+async def process_s3_ingestion_job(db: AsyncIOMotorDatabase, job: Dict[str, Any]) -> str:
+    """Ingest every supported object under an S3 prefix.
+
+    The object listing is stored on the job the first time it runs, so a
+    retried or resumed job only downloads objects not yet ingested.
+    """
+    rag_config, document_service = await _load_agent_services(db, job)
+    if not rag_config.s3_config:
+        raise ValueError("Agent has no S3 configuration")
+    storage_service = document_service.storage_service
+
+    if job.get("files") is None:
+        objects = await asyncio.to_thread(storage_service.list_objects, job["prefix"])
+        files = []
+        for obj in objects:
+            extension = os.path.splitext(obj["Key"])[1].lstrip('.').lower()
+            if extension in settings.ALLOWED_UPLOAD_EXTENSIONS:
+                files.append({
+                    "key": obj["Key"],
+                    "extension": extension,
+                    "original_name": obj["Key"],
+                    "size": obj.get("Size"),
+                    "status": "pending"
+                })
+        await db.jobs.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"files": files, "total_files": len(files)}}
+        )
+        job = {**job, "files": files, "total_files": len(files)}
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        return await _ingest_files(
+            db, job, document_service, rag_config.collection,
+            _s3_files(job, storage_service, tmp_dir)
+        )
+
+JOB_HANDLERS = {
+    INGEST_FILES: process_ingestion_job,
+    INGEST_S3: process_s3_ingestion_job
+}
@@ -0,0 +1,328 @@
+# File: app/services/ingestion_pipeline.py
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import threading
+import time
+from langchain_core.documents import Document
+from langchain_community.document_loaders import UnstructuredWordDocumentLoader
+from pypdf import PdfReader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from config.settings import settings
+from core.backoff import AdaptiveConcurrency, backoff_delay, is_rate_limited, is_retryable
+from .ingestion_index import chunk_id, content_hash
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+CHROMA_LOOKUP_BATCH = 500
+
+def _split(docs: List[Document]) -> List[Document]:
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+    return text_splitter.split_documents(docs)
+
+def load_and_split(file_path: str, file_type: str) -> List[Document]:
+    """Parse and split a non-PDF file. Runs inside a worker process."""
+    if file_type in ['docx', 'doc']:
+        loader = UnstructuredWordDocumentLoader(file_path)
+    else:
+        raise ValueError("Unsupported file type")
+    return _split(loader.load())
+
+def count_pdf_pages(file_path: str) -> int:
+    return len(PdfReader(file_path).pages)
+
+def extract_and_split_pdf_pages(file_path: str, start: int, end: int) -> List[Document]:
+    """Extract and split pages [start, end) of a PDF. Runs inside a worker process.
+
+    Produces the same per-page documents as PyPDFLoader; chunks never span
+    pages, so splitting each range independently matches splitting the
+    whole file.
+    """
+    reader = PdfReader(file_path)
+    total_pages = len(reader.pages)
+    docs = [
+        Document(
+            page_content=reader.pages[page].extract_text(),
+            metadata={"source": file_path, "page": page, "total_pages": total_pages}
+        )
+        for page in range(start, end)
+    ]
+    return _split(docs)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # Children are not forked from the threaded API process, whose
+            # locks could be copied mid-acquire
+            _process_pool = ProcessPoolExecutor(
+                max_workers=settings.INGESTION_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context(settings.INGESTION_PARSE_START_METHOD)
+            )
+        return _process_pool
+
+def discard_process_pool(pool: ProcessPoolExecutor):
+    """Drop a pool that a dead child (e.g. OOM-killed) has broken.
+
+    A broken pool rejects all further work, so the next caller of
+    get_process_pool() gets a fresh one instead.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def first_error(group: BaseExceptionGroup) -> BaseException:
+    """The first leaf exception of a (possibly nested) TaskGroup failure."""
+    error = group.exceptions[0]
+    while isinstance(error, BaseExceptionGroup):
+        error = error.exceptions[0]
+    return error
+
+def shutdown_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+class IngestionStats:
+    """Items processed and time spent per pipeline stage."""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, items: int, seconds: float):
+        entry = self.stages.setdefault(stage, {"items": 0, "seconds": 0.0})
+        entry["items"] += items
+        entry["seconds"] += seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            stage: {
+                **entry,
+                "items_per_second": entry["items"] / entry["seconds"] if entry["seconds"] else None
+            }
+            for stage, entry in self.stages.items()
+        }
+
+class IngestionPipeline:
+    """Parse/split in a process pool, embed in threads, write to Chroma in batches.
+
+    The split, embed and write stages are connected by small bounded queues
+    so each stage works on the next batch while the following stage handles
+    the previous one, and nothing in the pipeline runs on the event loop.
+
+    Ingestion is incremental: chunks get stable ids derived from their
+    document id and content, chunks already in the collection are left alone,
+    and embeddings of identical text already stored elsewhere in the
+    collection are copied instead of recomputed.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        vector_store,
+        batch_size: int = settings.INGESTION_BATCH_SIZE,
+        max_concurrency: int = settings.EMBEDDINGS_MAX_CONCURRENCY
+    ):
+        self.embeddings = embeddings
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    async def run(
+        self,
+        file_path: str,
+        file_type: str,
+        document_id: str,
+        source: str,
+        previous_chunk_ids: Optional[List[str]] = None
+    ) -> Tuple[IngestionStats, List[str]]:
+        stats = IngestionStats()
+        chunk_ids: List[str] = []
+        occurrences: Dict[str, int] = {}
+        embed_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+
+        async def split_stage():
+            pending: List[Document] = []
+            async for splits in self._parse(file_path, file_type, stats):
+                ids = self._assign_ids(splits, document_id, source, occurrences)
+                chunk_ids.extend(ids)
+                existing_ids = await asyncio.to_thread(self._existing_ids, ids)
+                new_splits = [doc for doc in splits if doc.metadata["chunk_id"] not in existing_ids]
+                stats.record("skipped", len(splits) - len(new_splits), 0.0)
+                pending.extend(new_splits)
+                while len(pending) >= self.batch_size:
+                    await embed_queue.put(pending[:self.batch_size])
+                    pending = pending[self.batch_size:]
+            if pending:
+                await embed_queue.put(pending)
+            await embed_queue.put(None)
+
+        limiter = AdaptiveConcurrency(self.max_concurrency)
+
+        async def embed_one(batch: List[Document]):
+            try:
+                started = time.perf_counter()
+                vectors, reused = await self._embed_with_backoff(batch, limiter, stats)
+                stats.record("embed", len(batch) - reused, time.perf_counter() - started)
+                stats.record("reused", reused, 0.0)
+            finally:
+                await limiter.release()
+            await write_queue.put((batch, vectors))
+
+        async def embed_stage():
+            # Up to limiter.limit batches are embedded at once; each is handed
+            # to the writer as soon as it is ready.
+            async with asyncio.TaskGroup() as batches:
+                while (batch := await embed_queue.get()) is not None:
+                    await limiter.acquire()
+                    batches.create_task(embed_one(batch))
+            await write_queue.put(None)
+
+        async def write_stage():
+            while (item := await write_queue.get()) is not None:
+                batch, vectors = item
+                started = time.perf_counter()
+                await asyncio.to_thread(self._write_batch, batch, vectors)
+                stats.record("write", len(batch), time.perf_counter() - started)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(split_stage())
+                group.create_task(embed_stage())
+                group.create_task(write_stage())
+        except* Exception as group:
+            # Surface the stage's own error (unsupported file, 401, parse
+            # error) rather than "unhandled errors in a TaskGroup"
+            raise first_error(group) from None
+
+        stale_ids = sorted(set(previous_chunk_ids or []) - set(chunk_ids))
+        if stale_ids:
+            await asyncio.to_thread(self.vector_store._collection.delete, ids=stale_ids)
+            stats.record("deleted", len(stale_ids), 0.0)
+
+        return stats, chunk_ids
+
+    async def _parse(self, file_path: str, file_type: str, stats: IngestionStats) -> AsyncIterator[List[Document]]:
+        """Yield split chunks in document order as soon as each part is parsed.
+
+        PDFs are cut into page ranges extracted in parallel across the
+        process pool; ranges are yielded in order, so embedding of the first
+        pages starts while later ones are still being extracted.
+        """
+        pool = get_process_pool()
+        try:
+            async for splits in self._parse_in_pool(pool, file_path, file_type, stats):
+                yield splits
+        except BrokenProcessPool:
+            discard_process_pool(pool)
+            raise
+
+    async def _parse_in_pool(
+        self,
+        pool: ProcessPoolExecutor,
+        file_path: str,
+        file_type: str,
+        stats: IngestionStats
+    ) -> AsyncIterator[List[Document]]:
+        loop = asyncio.get_running_loop()
+
+        if file_type != 'pdf':
+            started = time.perf_counter()
+            splits = await loop.run_in_executor(pool, load_and_split, file_path, file_type)
+            stats.record("parse", len(splits), time.perf_counter() - started)
+            yield splits
+            return
+
+        page_count = await loop.run_in_executor(pool, count_pdf_pages, file_path)
+        pages_per_task = settings.PDF_PAGES_PER_TASK
+        futures = [
+            loop.run_in_executor(pool, extract_and_split_pdf_pages, file_path, start, min(start + pages_per_task, page_count))
+            for start in range(0, page_count, pages_per_task)
+        ]
+        try:
+            for future in futures:
+                started = time.perf_counter()
+                splits = await future
+                stats.record("parse", len(splits), time.perf_counter() - started)
+                yield splits
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def _assign_ids(self, splits: List[Document], document_id: str, source: str, occurrences: Dict[str, int]) -> List[str]:
+        ids = []
+        for doc in splits:
+            text_hash = content_hash(doc.page_content)
+            occurrence = occurrences.get(text_hash, 0)
+            occurrences[text_hash] = occurrence + 1
+            doc.metadata["source"] = source
+            doc.metadata["document_id"] = document_id
+            doc.metadata["content_hash"] = text_hash
+            doc.metadata["chunk_id"] = chunk_id(document_id, doc.page_content, occurrence)
+            ids.append(doc.metadata["chunk_id"])
+        return ids
+
+    def _existing_ids(self, ids: List[str]) -> set:
+        found = set()
+        for i in range(0, len(ids), CHROMA_LOOKUP_BATCH):
+            result = self.vector_store._collection.get(ids=ids[i:i + CHROMA_LOOKUP_BATCH], include=[])
+            found.update(result["ids"])
+        return found
+
+    async def _embed_with_backoff(self, batch: List[Document], limiter: AdaptiveConcurrency, stats: IngestionStats):
+        attempt = 0
+        while True:
+            try:
+                result = await asyncio.to_thread(self._embed_batch, batch)
+                limiter.succeeded()
+                return result
+            except Exception as e:
+                if attempt >= settings.EMBEDDINGS_MAX_RETRIES or not is_retryable(e):
+                    raise
+                if is_rate_limited(e):
+                    limiter.throttled()
+                delay = backoff_delay(attempt, settings.EMBEDDINGS_BACKOFF_SECONDS, error=e)
+                stats.record("retry", 1, delay)
+                print(f"Embedding batch failed ({str(e)}); retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    def _embed_batch(self, batch: List[Document]) -> Tuple[List[List[float]], int]:
+        hashes = list({doc.metadata["content_hash"] for doc in batch})
+        known = self.vector_store._collection.get(
+            where={"content_hash": {"$in": hashes}},
+            include=["embeddings", "metadatas"]
+        )
+        reusable = {
+            metadata["content_hash"]: list(embedding)
+            for metadata, embedding in zip(known["metadatas"] or [], known["embeddings"] if known["embeddings"] is not None else [])
+        }
+
+        missing = [doc for doc in batch if doc.metadata["content_hash"] not in reusable]
+        if missing:
+            computed = self.embeddings.embed_documents([doc.page_content for doc in missing])
+            for doc, vector in zip(missing, computed):
+                reusable[doc.metadata["content_hash"]] = vector
+
+        return [reusable[doc.metadata["content_hash"]] for doc in batch], len(batch) - len(missing)
+
+    def _write_batch(self, batch: List[Document], vectors: List[List[float]]):
+        self.vector_store._collection.upsert(
+            ids=[doc.metadata["chunk_id"] for doc in batch],
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in batch],
+            documents=[doc.page_content for doc in batch]
+        )
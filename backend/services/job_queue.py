@@ -0,0 +1,205 @@
+# File: app/services/job_queue.py
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import os
+import socket
+import uuid
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, ReturnDocument
+from config.settings import settings
+
+QUEUED = "queued"
+PROCESSING = "processing"
+FAILED = "failed"
+
+class RetryableJobError(Exception):
+    """Raised by a handler when the job should be retried after a backoff."""
+
+class JobQueue:
+    """Persistent queue on top of the `jobs` collection.
+
+    Workers lease a job for JOB_LEASE_SECONDS and keep extending the lease
+    with heartbeats. A job whose lease expires (the worker crashed or was
+    redeployed) becomes available to the next worker that polls.
+    """
+
+    def __init__(self, db: AsyncIOMotorDatabase):
+        self.jobs = db.jobs
+
+    async def ensure_indexes(self):
+        await self.jobs.create_index([
+            ("status", ASCENDING),
+            ("type", ASCENDING),
+            ("next_attempt_at", ASCENDING)
+        ])
+
+    async def enqueue(self, job_type: str, job_id: Optional[str] = None, **fields) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        now = datetime.utcnow()
+        await self.jobs.insert_one({
+            "_id": job_id,
+            "type": job_type,
+            "status": QUEUED,
+            "progress": 0.0,
+            "created_at": now,
+            "attempts": 0,
+            "max_attempts": settings.JOB_MAX_ATTEMPTS,
+            "next_attempt_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            **fields
+        })
+        return job_id
+
+    async def lease(self, worker_id: str, job_types: List[str]) -> Optional[Dict[str, Any]]:
+        now = datetime.utcnow()
+        return await self.jobs.find_one_and_update(
+            {
+                "type": {"$in": job_types},
+                "status": {"$in": [QUEUED, PROCESSING]},
+                "next_attempt_at": {"$lte": now},
+                "$or": [
+                    {"lease_expires_at": None},
+                    {"lease_expires_at": {"$lt": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": PROCESSING,
+                    "lease_owner": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    "heartbeat_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        now = datetime.utcnow()
+        result = await self.jobs.update_one(
+            {"_id": job_id, "lease_owner": worker_id},
+            {"$set": {
+                "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                "heartbeat_at": now
+            }}
+        )
+        return result.matched_count == 1
+
+    async def complete(self, job_id: str, worker_id: str, status: str, **fields):
+        await self.jobs.update_one(
+            {"_id": job_id, "lease_owner": worker_id},
+            {"$set": {
+                "status": status,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "completed_at": datetime.utcnow(),
+                **fields
+            }}
+        )
+
+    async def retry_or_fail(self, job: Dict[str, Any], worker_id: str, error: str):
+        if job["attempts"] >= job.get("max_attempts", settings.JOB_MAX_ATTEMPTS):
+            await self.complete(job["_id"], worker_id, FAILED, error=error)
+            return
+        backoff = settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1)
+        await self.jobs.update_one(
+            {"_id": job["_id"], "lease_owner": worker_id},
+            {"$set": {
+                "status": QUEUED,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "next_attempt_at": datetime.utcnow() + timedelta(seconds=backoff),
+                "last_error": error
+            }}
+        )
+
+    async def release(self, job_id: str, worker_id: str):
+        """Hand a job back without counting the interrupted attempt."""
+        await self.jobs.update_one(
+            {"_id": job_id, "lease_owner": worker_id},
+            {
+                "$set": {"status": QUEUED, "lease_owner": None, "lease_expires_at": None},
+                "$inc": {"attempts": -1}
+            }
+        )
+
+JobHandler = Callable[[AsyncIOMotorDatabase, Dict[str, Any]], Awaitable[Optional[str]]]
+
+class JobWorker:
+    """Runs up to `concurrency` leased jobs at a time.
+
+    A handler returns the final job status (defaults to "completed"). Any
+    exception schedules a retry with exponential backoff until the job runs
+    out of attempts.
+    """
+
+    def __init__(
+        self,
+        db: AsyncIOMotorDatabase,
+        handlers: Dict[str, JobHandler],
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY
+    ):
+        self.db = db
+        self.queue = JobQueue(db)
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        await self.queue.ensure_indexes()
+        print(f"Job worker {self.worker_id} started with concurrency {self.concurrency}")
+        await asyncio.gather(*(self._poll() for _ in range(self.concurrency)))
+
+    def stop(self):
+        self._stopping.set()
+
+    async def _poll(self):
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.lease(self.worker_id, list(self.handlers))
+            except Exception as e:
+                print(f"Error leasing job: {str(e)}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=settings.JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self._run_job(job)
+
+    async def _run_job(self, job: Dict[str, Any]):
+        job_id = job["_id"]
+        task = asyncio.create_task(self.handlers[job["type"]](self.db, job))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, task))
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            await asyncio.wait({task, stopping}, return_when=asyncio.FIRST_COMPLETED)
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                await self.queue.release(job_id, self.worker_id)
+                return
+            status = task.result()
+            await self.queue.complete(job_id, self.worker_id, status or "completed", progress=1.0)
+        except asyncio.CancelledError:
+            if not heartbeat.done():
+                raise
+            print(f"Lost lease on job {job_id}; another worker will resume it")
+        except Exception as e:
+            print(f"Error processing job {job_id}: {str(e)}")
+            await self.queue.retry_or_fail(job, self.worker_id, str(e))
+        finally:
+            heartbeat.cancel()
+            stopping.cancel()
+
+    async def _heartbeat(self, job_id: str, task: asyncio.Task):
+        while True:
+            await asyncio.sleep(settings.JOB_HEARTBEAT_SECONDS)
+            if not await self.queue.heartbeat(job_id, self.worker_id):
+                task.cancel()
+                return
@@ -0,0 +1,256 @@
+# File: app/services/llm_hedging.py
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import threading
+import time
+from langchain_core.language_models.chat_models import BaseChatModel, agenerate_from_stream
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from config.settings import settings
+
+class ModelHealth:
+    """Per-model latency and error tracking shared by every agent.
+
+    Latency is an exponentially weighted average of time to first token. A
+    model that fails LLM_FAILURE_THRESHOLD times in a row is marked
+    unhealthy for LLM_FAILURE_COOLDOWN seconds and tried last meanwhile.
+    """
+
+    def __init__(self, failure_threshold: int, cooldown: float, alpha: float = 0.2):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, name: str) -> Dict[str, Any]:
+        if name not in self._models:
+            self._models[name] = {
+                "latency": None,
+                "successes": 0,
+                "failures": 0,
+                "hedges_won": 0,
+                "hedges_lost": 0,
+                "consecutive_failures": 0,
+                "unhealthy_until": 0.0
+            }
+        return self._models[name]
+
+    def record_success(self, name: str, latency: Optional[float] = None, hedged: bool = False):
+        with self._lock:
+            entry = self._entry(name)
+            entry["successes"] += 1
+            entry["consecutive_failures"] = 0
+            entry["unhealthy_until"] = 0.0
+            if hedged:
+                entry["hedges_won"] += 1
+            if latency is not None:
+                self._observe_latency(entry, latency)
+
+    def record_abandoned(self, name: str, elapsed: float):
+        """A request cancelled after losing a hedge took at least `elapsed`."""
+        with self._lock:
+            entry = self._entry(name)
+            entry["hedges_lost"] += 1
+            self._observe_latency(entry, elapsed)
+
+    def _observe_latency(self, entry: Dict[str, Any], latency: float):
+        previous = entry["latency"]
+        entry["latency"] = latency if previous is None else previous + self.alpha * (latency - previous)
+
+    def record_failure(self, name: str):
+        with self._lock:
+            entry = self._entry(name)
+            entry["failures"] += 1
+            entry["consecutive_failures"] += 1
+            if entry["consecutive_failures"] >= self.failure_threshold:
+                entry["unhealthy_until"] = time.monotonic() + self.cooldown
+
+    def is_healthy(self, name: str) -> bool:
+        with self._lock:
+            return self._entry(name)["unhealthy_until"] <= time.monotonic()
+
+    def latency(self, name: str) -> Optional[float]:
+        with self._lock:
+            return self._entry(name)["latency"]
+
+    def order(self, names: List[str]) -> List[int]:
+        """Indexes of `names` in the order to try them.
+
+        Healthy models come first. Among them the primary keeps its place
+        and the fallbacks are ordered by observed latency, untried ones
+        first so they get measured.
+        """
+        def rank(i: int):
+            latency = self.latency(names[i])
+            return (
+                not self.is_healthy(names[i]),
+                i != 0,
+                latency is not None,
+                latency or 0.0,
+                i
+            )
+        return sorted(range(len(names)), key=rank)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    **{k: v for k, v in entry.items() if k != "unhealthy_until"},
+                    "healthy": entry["unhealthy_until"] <= now
+                }
+                for name, entry in self._models.items()
+            }
+
+model_health = ModelHealth(settings.LLM_FAILURE_THRESHOLD, settings.LLM_FAILURE_COOLDOWN)
+
+async def _first_token(stream: AsyncIterator) -> Tuple[List[Any], bool]:
+    """Read a stream up to its first chunk with content.
+
+    Returns the chunks read so far and whether the stream is exhausted.
+    Role-only chunks some providers send up front do not count as a token.
+    """
+    chunks = []
+    async for chunk in stream:
+        chunks.append(chunk)
+        if chunk.content:
+            return chunks, False
+    return chunks, True
+
+async def _cancel(pending: Dict[asyncio.Task, Tuple[str, Any, float]]):
+    """Cancel the losing requests and close their HTTP streams."""
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    for _, stream, _ in pending.values():
+        await stream.aclose()
+
+# Candidates run without the caller's callbacks: the hedged call is the one
+# LLM run they see, instead of one more per candidate including the losers
+_NO_CALLBACKS = {"callbacks": []}
+
+class HedgedChatModel(BaseChatModel):
+    """Chat model that hedges a slow primary with the configured fallbacks.
+
+    The first candidate is sent the request. If it has produced no token
+    within `first_token_deadline` seconds, the next candidate is sent the
+    same request; whichever produces a token first is streamed and the
+    others are cancelled. A candidate that errors before its first token
+    is replaced immediately.
+    """
+
+    models: List[BaseChatModel]
+    names: List[str]
+    first_token_deadline: float
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    def _candidates(self) -> List[Tuple[str, BaseChatModel]]:
+        return [(self.names[i], self.models[i]) for i in model_health.order(self.names)]
+
+    async def _race(self, candidates, start):
+        """Run `start(model)` against candidates with hedging.
+
+        Returns (name, stream, result) of the winner, where `start` returns
+        (stream, awaitable) and the awaitable's result decides the winner.
+        """
+        pending: Dict[asyncio.Task, Tuple[str, Any, float]] = {}
+        next_candidate = 0
+        last_error = None
+
+        def launch():
+            nonlocal next_candidate
+            name, model = candidates[next_candidate]
+            next_candidate += 1
+            stream, awaitable = start(model)
+            pending[asyncio.ensure_future(awaitable)] = (name, stream, time.monotonic())
+
+        launch()
+        try:
+            while True:
+                timeout = self.first_token_deadline if next_candidate < len(candidates) else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    launch()
+                    continue
+                for task in done:
+                    name, stream, started = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except Exception as e:
+                        print(f"LLM {name} failed: {str(e)}")
+                        model_health.record_failure(name)
+                        last_error = e
+                        await stream.aclose()
+                        continue
+                    model_health.record_success(
+                        name,
+                        time.monotonic() - started,
+                        hedged=name != candidates[0][0]
+                    )
+                    return name, stream, result
+                if not pending:
+                    if next_candidate < len(candidates):
+                        launch()
+                    else:
+                        raise last_error
+        finally:
+            for name, _, started in pending.values():
+                model_health.record_abandoned(name, time.monotonic() - started)
+            await _cancel(pending)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        def start(model):
+            stream = model.astream(messages, config=_NO_CALLBACKS, stop=stop, **kwargs)
+            return stream, _first_token(stream)
+
+        _, stream, (chunks, exhausted) = await self._race(self._candidates(), start)
+        try:
+            for chunk in chunks:
+                yield ChatGenerationChunk(message=chunk)
+            if not exhausted:
+                async for chunk in stream:
+                    yield ChatGenerationChunk(message=chunk)
+        finally:
+            await stream.aclose()
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> ChatResult:
+        # Hedge on the first token like streaming does; racing whole
+        # completions against the deadline would duplicate every long answer
+        return await agenerate_from_stream(self._astream(messages, stop=stop, **kwargs))
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager=None,
+        **kwargs: Any
+    ) -> ChatResult:
+        # Synchronous calls cannot be hedged; fall back on errors only
+        last_error = None
+        for name, model in self._candidates():
+            try:
+                message = model.invoke(messages, config=_NO_CALLBACKS, stop=stop, **kwargs)
+            except Exception as e:
+                print(f"LLM {name} failed: {str(e)}")
+                model_health.record_failure(name)
+                last_error = e
+                continue
+            model_health.record_success(name)
+            return ChatResult(generations=[ChatGeneration(message=message)])
+        raise last_error
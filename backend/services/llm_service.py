@@ -1,43 +1,114 @@
 # File: app/services/llm_service.py
 from langchain_openai import ChatOpenAI
 from langchain_google_genai import ChatGoogleGenerativeAI
+from core.cache import TTLCache
 from core.models import LLMConfig, RAGConfig
+from config.settings import settings
+from .llm_hedging import HedgedChatModel
+from typing import Dict, Optional, Tuple
+import httpx
+import threading
 import os
 
+# Chat model clients shared by every request in the process, keyed by
+# (api_type, model, base_url, api_key, temperature). Building a client per
+# request meant a new connection pool, and a new TLS handshake, per chat.
+_llm_clients = TTLCache(
+    max_size=settings.LLM_CLIENT_CACHE_SIZE,
+    ttl=settings.LLM_CLIENT_IDLE_TTL,
+    sliding=True
+)
+
+# Keep-alive connection pools per provider endpoint, shared by all clients
+# that talk to it regardless of model, key or temperature
+_http_clients: Dict[Optional[str], Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_http_clients_lock = threading.Lock()
+
+def _http_clients_for(base_url: Optional[str]) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    with _http_clients_lock:
+        if base_url not in _http_clients:
+            limits = httpx.Limits(
+                max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+                keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY
+            )
+            timeout = httpx.Timeout(settings.LLM_HTTP_TIMEOUT)
+            _http_clients[base_url] = (
+                httpx.Client(limits=limits, timeout=timeout),
+                httpx.AsyncClient(limits=limits, timeout=timeout)
+            )
+        return _http_clients[base_url]
+
+def _create_llm(key):
+    api_type, model, base_url, api_key, temperature = key
+    if api_type == "OpenAI":
+        http_client, http_async_client = _http_clients_for(base_url)
+        return ChatOpenAI(
+            model=model,
+            base_url=base_url,
+            api_key=api_key,
+            temperature=temperature,
+            http_client=http_client,
+            http_async_client=http_async_client
+        )
+    if api_type == "Gemini":
+        return ChatGoogleGenerativeAI(model=model, api_key=api_key)
+    raise ValueError(f"Unsupported API type: {api_type}")
+
+def llm_client_stats():
+    return {**_llm_clients.stats(), "http_pools": len(_http_clients)}
+
+async def close_llm_clients():
+    _llm_clients.clear()
+    with _http_clients_lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+    for http_client, http_async_client in clients:
+        http_client.close()
+        await http_async_client.aclose()
+
 class LLMService:
     def __init__(self, models_config: dict):
         self.models_config = models_config
 
-    def get_llm(self, config: RAGConfig) -> ChatOpenAI | ChatGoogleGenerativeAI:
+    def get_llm(self, config: RAGConfig) -> ChatOpenAI | ChatGoogleGenerativeAI | HedgedChatModel:
         if config.advancedLLMConfig:
-            print(config.advancedLLMConfig.api_key)
-            return self._get_llm_advanced(config.advancedLLMConfig)
-        
-        model_name = config.llm
+            primary_name = config.advancedLLMConfig.model
+            primary = self._get_llm_advanced(config.advancedLLMConfig)
+        else:
+            primary_name = config.llm
+            primary = self._get_configured_llm(config.llm)
+
+        if not config.fallback_llms:
+            return primary
+
+        names = [primary_name] + [name for name in config.fallback_llms if name != primary_name]
+        return HedgedChatModel(
+            models=[primary] + [self._get_configured_llm(name) for name in names[1:]],
+            names=names,
+            first_token_deadline=config.first_token_deadline or settings.LLM_FIRST_TOKEN_DEADLINE
+        )
+
+    def _get_configured_llm(self, model_name: str):
         model_config = self.models_config.get(model_name)
         
         if not model_config:
             raise ValueError(f"Model {model_name} not found in configuration")
         
         if model_config["api_type"] == "OpenAI":
-            return ChatOpenAI(
-                model=model_name,
-                base_url=model_config.get("base_url"),
-                api_key=os.getenv(model_config["api_key_env"]),
-                temperature=model_config.get("temperature", 0.7)
+            key = (
+                "OpenAI",
+                model_name,
+                model_config.get("base_url"),
+                os.getenv(model_config["api_key_env"]),
+                model_config.get("temperature", 0.7)
             )
         elif model_config["api_type"] == "Gemini":
-            return ChatGoogleGenerativeAI(
-                model=model_name,
-                api_key=os.getenv(model_config["api_key_env"])
-            )
+            key = ("Gemini", model_name, None, os.getenv(model_config["api_key_env"]), None)
         else:
             raise ValueError(f"Unsupported API type: {model_config['api_type']}")
+        return _llm_clients.get_or_create(key, lambda: _create_llm(key))
 
     def _get_llm_advanced(self, config: LLMConfig):
-        return ChatOpenAI(
-            model=config.model,
-            base_url=config.base_url,
-            api_key=config.api_key,
-            temperature=config.temperature
-        )
\ No newline at end of file
+        key = ("OpenAI", config.model, config.base_url, config.api_key, config.temperature)
+        return _llm_clients.get_or_create(key, lambda: _create_llm(key))
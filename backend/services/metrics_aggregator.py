@@ -0,0 +1,164 @@
+# File: app/services/metrics_aggregator.py
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure, ServerSelectionTimeoutError
+from config.settings import settings
+
+def truncate_hour(moment: datetime) -> datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+def truncate_day(moment: datetime) -> datetime:
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def truncate_month(moment: datetime) -> datetime:
+    return truncate_day(moment).replace(day=1)
+
+# Rollup collection and bucket start for each granularity. The daily rollup
+# keeps the original `metrics` collection so existing documents stay valid.
+ROLLUPS = {
+    "hour": ("metrics_hourly", truncate_hour),
+    "day": ("metrics", truncate_day),
+    "month": ("metrics_monthly", truncate_month),
+}
+
+def _counters() -> Dict[Tuple[str, datetime], Dict[str, float]]:
+    return defaultdict(lambda: defaultdict(float))
+
+def _merge(target: Dict[str, float], counters: Dict[str, float]):
+    for field, value in counters.items():
+        target[field] += value
+
+async def ensure_metrics_indexes(db: AsyncIOMotorDatabase):
+    for collection, _ in ROLLUPS.values():
+        keys = [("agent_id", ASCENDING), ("date", ASCENDING)]
+        try:
+            await db[collection].create_index(keys, unique=True)
+        except OperationFailure as e:
+            # Older deployments can hold duplicate daily documents from the
+            # read-modify-write era; index them anyway until they are merged
+            print(f"Creating non-unique index on {collection}: {str(e)}")
+            await db[collection].create_index(keys)
+
+def with_averages(metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Derive the average latencies the dashboard reads from the stored sums.
+
+    Documents written before the sums existed already hold the averages and
+    are returned unchanged.
+    """
+    timed_calls = metrics.get("timed_calls")
+    if timed_calls:
+        metrics["first_token_latency"] = metrics.get("first_token_latency_sum", 0) / timed_calls
+        metrics["total_response_time"] = metrics.get("total_response_time_sum", 0) / timed_calls
+    return metrics
+
+class MetricsAggregator:
+    """Accumulates chat metrics in memory and flushes them in batches.
+
+    Counts and latency sums are kept per agent and hour and written with
+    `$inc` upserts into the hourly, daily and monthly rollups every
+    METRICS_FLUSH_INTERVAL seconds, so concurrent requests and processes
+    never overwrite each other's updates and a chat costs no Mongo
+    round-trip of its own.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending = _counters()
+        self._unflushed: Dict[str, Dict[Tuple[str, datetime], Dict[str, float]]] = {}
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+
+    def record(
+        self,
+        agent_id: str,
+        first_token_latency: Optional[float] = None,
+        total_response_time: Optional[float] = None,
+        outcome: str = "completed"
+    ):
+        counters = self._pending[(agent_id, truncate_hour(datetime.utcnow()))]
+        counters["calls"] += 1
+        if outcome != "completed":
+            # "cancelled" (client went away) or "failed"
+            counters[outcome] += 1
+        if first_token_latency is not None and total_response_time is not None:
+            counters["timed_calls"] += 1
+            counters["first_token_latency_sum"] += first_token_latency
+            counters["total_response_time_sum"] += total_response_time
+
+    def start(self, db: AsyncIOMotorDatabase):
+        self._db = db
+        self._stopping.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self):
+        if self._db is None:
+            return
+        pending, self._pending = self._pending, _counters()
+        for collection, truncate in ROLLUPS.values():
+            buckets = self._unflushed.setdefault(collection, _counters())
+            for (agent_id, hour), counters in pending.items():
+                _merge(buckets[(agent_id, truncate(hour))], counters)
+
+        # Upserts use $inc, so re-sending one that was applied double-counts
+        # it. Only operations known not to have been applied are kept for
+        # the next flush: those the server rejected, or all of them when no
+        # server could be reached at all.
+        for collection in list(self._unflushed):
+            buckets = self._unflushed.pop(collection)
+            if not buckets:
+                continue
+            keys = list(buckets)
+            try:
+                await self._db[collection].bulk_write([
+                    UpdateOne(
+                        {"agent_id": agent_id, "date": date},
+                        {"$inc": dict(buckets[(agent_id, date)])},
+                        upsert=True
+                    )
+                    for agent_id, date in keys
+                ], ordered=False)
+            except BulkWriteError as e:
+                failed = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+                print(f"Error flushing {len(failed)} metrics to {collection}: {str(e)}")
+                self._requeue(collection, {key: buckets[key] for key in failed})
+            except ServerSelectionTimeoutError as e:
+                print(f"Error flushing metrics to {collection}: {str(e)}")
+                self._requeue(collection, buckets)
+            except Exception as e:
+                # The writes may have been partly applied; retrying could
+                # count them twice, so these counters are dropped
+                print(f"Error flushing metrics to {collection}, dropping {len(keys)} buckets: {str(e)}")
+
+    def _requeue(self, collection: str, buckets: Dict[Tuple[str, datetime], Dict[str, float]]):
+        retry = self._unflushed.setdefault(collection, _counters())
+        for key, counters in buckets.items():
+            _merge(retry[key], counters)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending_keys": len(self._pending),
+            "unflushed_keys": sum(len(buckets) for buckets in self._unflushed.values()),
+            "flush_interval": self.interval
+        }
+
+metrics_aggregator = MetricsAggregator(settings.METRICS_FLUSH_INTERVAL)
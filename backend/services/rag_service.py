@@ -5,11 +5,11 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, Prom
 from core.models import RAGConfig
 from .llm_service import LLMService
 from .embeddings_service import EmbeddingsService
+from .sql_service import QueryHandle, run_sql_blocking, get_schema_summary, execute_query
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough, RunnableLambda, RunnableParallel
-from langchain_community.tools.sql_database.tool import QuerySQLDataBaseTool
-from langchain_community.utilities import SQLDatabase
 from operator import itemgetter
+import asyncio
 from langchain_core.output_parsers import JsonOutputParser
 
 class RAGService:
@@ -34,6 +34,12 @@ class RAGService:
             "just reformulate it if needed and otherwise return it as is."
         )
     
+    @staticmethod
+    def resolve_chain_type(config: RAGConfig, chain_type=None) -> str:
+        if chain_type:
+            return chain_type
+        return 'RAG + SQL' if config.sql_config else 'RAG ONLY'
+
     def get_chain(self, config: RAGConfig, chain_type=None):
         if chain_type:
             if chain_type == 'RAG ONLY':
@@ -49,10 +55,26 @@ class RAGService:
                 return self.get_rag_chain(config)
 
 
+    def get_retriever(self, config: RAGConfig, k: int = 4):
+        # Equivalent to vector_store.as_retriever(), split into named steps so
+        # query embedding and vector search show up as separate stages
+        embeddings = self.embeddings_service.get_embeddings()
+        vector_store = self.embeddings_service.get_vector_store(config.collection)
+
+        def search(embedding):
+            return vector_store.similarity_search_by_vector(embedding, k=k)
+
+        async def asearch(embedding):
+            return await asyncio.to_thread(search, embedding)
+
+        return (
+            RunnableLambda(embeddings.embed_query, afunc=embeddings.aembed_query).with_config(run_name="embed_query")
+            | RunnableLambda(search, afunc=asearch).with_config(run_name="vector_search")
+        )
+
     def get_rag_chain(self, config: RAGConfig):
         llm = self.llm_service.get_llm(config)
-        vector_store = self.embeddings_service.get_vector_store(config.collection)
-        retriever = vector_store.as_retriever()
+        retriever = self.get_retriever(config)
         contextualize_q_system_prompt = self.DEFAULT_CONTEXTUALIZATION_PROMPT
         if config.contextualization_prompt:
             contextualize_q_system_prompt = config.contextualization_prompt
@@ -81,9 +103,6 @@ class RAGService:
         if not sql_config:
             return 
         llm = self.llm_service.get_llm(config)
-        sql_uri = f'postgresql://{sql_config.username}:{sql_config.password}@{sql_config.url}/{sql_config.db_name}'
-        sql_db = SQLDatabase.from_uri(sql_uri)
-        execute_query = QuerySQLDataBaseTool(db=sql_db)
         
         sql_prompt = PromptTemplate(
             input_variables=['input', 'table_info', 'chat_history'],
@@ -101,43 +120,50 @@ class RAGService:
             )
         )
 
-        def get_table_info(db: SQLDatabase):
-            return db.run(
-                '''
-                SELECT
-                    table_name || ': [' || string_agg(column_name, ', ') || ']' AS table_columns
-                FROM
-                    information_schema.columns
-                WHERE
-                    table_schema = 'public'  
-                GROUP BY
-                    table_name
-                ORDER BY
-                    table_name;
-                '''
-            )
-        
         def process_sql_input(inputs):
             return {
                 "input": inputs["input"],
                 "chat_history": inputs.get("chat_history", []),
-                "table_info": get_table_info(sql_db)
+                "table_info": get_schema_summary(sql_config)
             }
 
-        # Create two parallel chains
+        async def aprocess_sql_input(inputs):
+            return {
+                "input": inputs["input"],
+                "chat_history": inputs.get("chat_history", []),
+                "table_info": await run_sql_blocking(get_schema_summary, sql_config)
+            }
+
+        def execute_sql(sql_query: str):
+            if '$$NOT REQUIRED$$' in sql_query:
+                return sql_query
+            return execute_query(sql_config, sql_query)
+
+        async def aexecute_sql(sql_query: str):
+            if '$$NOT REQUIRED$$' in sql_query:
+                return sql_query
+            handle = QueryHandle()
+            try:
+                return await run_sql_blocking(execute_query, sql_config, sql_query, handle)
+            except asyncio.CancelledError:
+                # The executor thread keeps running; stop the query on the server
+                handle.cancel()
+                raise
+
         sql_generation_chain = (
-            RunnableLambda(process_sql_input)
+            RunnableLambda(process_sql_input, afunc=aprocess_sql_input)
             | sql_prompt
             | llm
             | StrOutputParser()
-        )
+        ).with_config(run_name="sql_generation")
         
-        execution_chain = sql_generation_chain | execute_query
-        
-        # Combine them using RunnableParallel
-        chain = RunnableParallel(
-            sql_query=sql_generation_chain,
-            query_results=execution_chain
+        # Generate the query once and execute exactly the text that is returned
+        chain = (
+            RunnableParallel(sql_query=sql_generation_chain)
+            | RunnablePassthrough.assign(
+                query_results=itemgetter("sql_query")
+                | RunnableLambda(execute_sql, afunc=aexecute_sql).with_config(run_name="sql_execution")
+            )
         )
         
         return chain
@@ -148,8 +174,7 @@ class RAGService:
             return 
         llm = self.llm_service.get_llm(config)
         sql_chain = self.get_sql_chain(config)
-        vector_store = self.embeddings_service.get_vector_store(config.collection)
-        retriever = vector_store.as_retriever()
+        retriever = self.get_retriever(config)
         
         contextualize_q_system_prompt = self.DEFAULT_CONTEXTUALIZATION_PROMPT
         if config.contextualization_prompt:
@@ -177,9 +202,8 @@ class RAGService:
         ])
         
         def combine_inputs(inputs):
-            results = sql_chain.invoke(inputs)
-            sql_query = results['sql_query']
-            sql_result = results['query_results']
+            sql_query = inputs["sql"]['sql_query']
+            sql_result = inputs["sql"]['query_results']
             return {
                 "sql_query": sql_query,
                 "sql_result": sql_result if '$$NOT REQUIRED$$' not in sql_result else 'The question does not require data from the database',
@@ -188,11 +212,17 @@ class RAGService:
                 "chat_history": inputs.get("chat_history", [])
             }
         
+        # Retrieval and SQL generation/execution run concurrently; under
+        # astream neither branch blocks the event loop.
         chain = (
-            {"context" : retriever_chain, "input": itemgetter("input"), "chat_history": itemgetter("chat_history")}
+            RunnableParallel(
+                context=retriever_chain,
+                sql=sql_chain,
+                input=itemgetter("input"),
+                chat_history=itemgetter("chat_history")
+            )
             | RunnableLambda(combine_inputs)
             | create_stuff_documents_chain(llm, qa_prompt)
         )
 
         return chain
-
@@ -0,0 +1,183 @@
+# File: app/services/sql_service.py
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+import asyncio
+import re
+import threading
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Engine
+from langchain_community.utilities import SQLDatabase
+from core.cache import TTLCache
+from core.models import SQLConfig
+from config.settings import settings
+
+# Blocking database drivers run on a dedicated, bounded pool so SQL questions
+# never occupy the event loop and cannot starve the default executor.
+_sql_executor = ThreadPoolExecutor(
+    max_workers=settings.SQL_EXECUTOR_WORKERS,
+    thread_name_prefix="sql"
+)
+
+SCHEMA_SUMMARY_QUERY = '''
+    SELECT
+        table_name || ': [' || string_agg(column_name, ', ') || ']' AS table_columns
+    FROM
+        information_schema.columns
+    WHERE
+        table_schema = 'public'  
+    GROUP BY
+        table_name
+    ORDER BY
+        table_name;
+'''
+
+def _dispose(_, engine: Engine):
+    engine.dispose()
+
+# One SQLAlchemy engine (and connection pool) per configured database, plus a
+# short-lived cache of the schema summary fed to the SQL prompt.
+_sql_engines = TTLCache(max_size=settings.SQL_ENGINE_CACHE_SIZE, on_evict=_dispose)
+_schema_summaries = TTLCache(max_size=settings.SQL_ENGINE_CACHE_SIZE, ttl=settings.SQL_SCHEMA_CACHE_TTL)
+_query_results = TTLCache(max_size=settings.SQL_RESULT_CACHE_SIZE, ttl=settings.SQL_RESULT_CACHE_TTL)
+
+async def run_sql_blocking(func: Callable[..., Any], *args) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sql_executor, func, *args)
+
+def shutdown_sql_executor():
+    _sql_executor.shutdown(wait=False, cancel_futures=True)
+    for key, engine in _sql_engines.items():
+        _dispose(key, engine)
+    _sql_engines.clear()
+
+def sql_config_key(sql_config: SQLConfig):
+    return (sql_config.url, sql_config.username, sql_config.password, sql_config.db_name)
+
+def get_sql_engine(sql_config: SQLConfig) -> Engine:
+    def create():
+        sql_uri = f'postgresql://{sql_config.username}:{sql_config.password}@{sql_config.url}/{sql_config.db_name}'
+        return create_engine(
+            sql_uri,
+            pool_size=settings.SQL_POOL_SIZE,
+            max_overflow=settings.SQL_MAX_OVERFLOW,
+            pool_recycle=settings.SQL_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+    return _sql_engines.get_or_create(sql_config_key(sql_config), create)
+
+def get_sql_database(sql_config: SQLConfig) -> SQLDatabase:
+    return SQLDatabase(get_sql_engine(sql_config), lazy_table_reflection=True)
+
+def get_schema_summary(sql_config: SQLConfig) -> str:
+    return _schema_summaries.get_or_create(
+        sql_config_key(sql_config),
+        lambda: get_sql_database(sql_config).run(SCHEMA_SUMMARY_QUERY)
+    )
+
+def refresh_schema_summary(sql_config: SQLConfig) -> str:
+    _schema_summaries.pop(sql_config_key(sql_config))
+    return get_schema_summary(sql_config)
+
+def normalize_sql(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().rstrip(";").strip()
+
+class QueryHandle:
+    """Lets another thread cancel a query running in the SQL executor.
+
+    `cancel()` asks the server to abort the statement through the DB-API
+    connection (psycopg2's `connection.cancel()`); a query that has not
+    started yet is not run at all.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection = None
+        self.cancelled = False
+
+    def attach(self, dbapi_connection) -> bool:
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._connection = dbapi_connection
+            return True
+
+    def detach(self):
+        with self._lock:
+            self._connection = None
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            connection = self._connection
+        if connection is not None and hasattr(connection, "cancel"):
+            try:
+                connection.cancel()
+            except Exception as e:
+                print(f"Error cancelling SQL query: {str(e)}")
+
+def execute_query(sql_config: SQLConfig, query: str, handle: Optional[QueryHandle] = None) -> str:
+    """Run a generated query with a statement timeout and row/byte caps.
+
+    Mirrors QuerySQLDataBaseTool by returning errors as text for the prompt
+    instead of raising. Successful results are cached briefly per database
+    and normalized query text.
+    """
+    timeout_ms = sql_config.statement_timeout_ms or settings.SQL_STATEMENT_TIMEOUT_MS
+    max_rows = sql_config.max_rows or settings.SQL_MAX_ROWS
+    max_bytes = sql_config.max_result_bytes or settings.SQL_MAX_RESULT_BYTES
+
+    # The limits shape the cached text, so agents with different caps on the
+    # same database must not share entries
+    normalized = normalize_sql(query)
+    cache_key = (sql_config_key(sql_config), max_rows, max_bytes, normalized)
+    cached = _query_results.get(cache_key)
+    if cached is not None:
+        return cached
+
+    engine = get_sql_engine(sql_config)
+    try:
+        # A server-side cursor, so only max_rows + 1 rows ever leave Postgres
+        # instead of the whole result set being loaded during execute. With
+        # no_parameters the driver gets no parameter dict, so a literal % in
+        # generated SQL (LIKE '%foo%') is not read as a placeholder.
+        with engine.connect().execution_options(
+            stream_results=True,
+            max_row_buffer=max_rows + 1,
+            no_parameters=True
+        ) as connection:
+            with connection.begin():
+                connection.execute(text(f"SET LOCAL statement_timeout = {int(timeout_ms)}"))
+                if handle and not handle.attach(connection.connection.dbapi_connection):
+                    return "Error: query cancelled"
+                try:
+                    cursor = connection.exec_driver_sql(query.strip().rstrip(";"))
+                    if not cursor.returns_rows:
+                        return ""
+                    rows = [tuple(row) for row in cursor.fetchmany(max_rows + 1)]
+                    cursor.close()
+                finally:
+                    if handle:
+                        handle.detach()
+    except Exception as e:
+        return f"Error: {e}"
+
+    notes = []
+    if len(rows) > max_rows:
+        rows = rows[:max_rows]
+        notes.append(f"only the first {max_rows} rows are shown")
+    result = str(rows) if rows else ""
+    if len(result.encode()) > max_bytes:
+        result = result.encode()[:max_bytes].decode(errors="ignore")
+        notes.append(f"output was cut to {max_bytes} bytes")
+    if notes:
+        result += f"\n(Result truncated: {', '.join(notes)}.)"
+
+    _query_results.set(cache_key, result)
+    return result
+
+def sql_cache_stats():
+    return {
+        "engines": _sql_engines.stats(),
+        "schemas": _schema_summaries.stats(),
+        "results": _query_results.stats()
+    }
@@ -0,0 +1,200 @@
+# File: app/services/stage_metrics.py
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+import bisect
+import threading
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Upper bounds in seconds, from a fast cache hit to a slow model completion
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Runnables named with run_name in RAGService and the stage they measure
+STAGE_RUN_NAMES = {
+    "embed_query": "embedding",
+    "vector_search": "vector_search",
+    "sql_generation": "sql_generation",
+    "sql_execution": "sql_execution",
+}
+# Chain that create_history_aware_retriever wraps the rephrasing LLM call in
+CONTEXTUALIZATION_RUN_NAME = "chat_retriever_chain"
+
+class Histogram:
+    """Fixed-bucket latency histogram, like a Prometheus histogram.
+
+    Memory stays constant however many samples are observed; quantiles are
+    interpolated within the bucket they fall in.
+    """
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                lower = BUCKETS[i - 1] if i else 0.0
+                upper = BUCKETS[i] if BUCKETS[i] != float("inf") else lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return BUCKETS[-2]
+
+class StageMetrics:
+    """Process-wide latency histograms per agent, chain type and stage.
+
+    Only stages that complete are timed; failed or cancelled ones are
+    counted separately so they don't skew the latency distribution.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[Tuple[str, str, str], Histogram] = {}
+        self._errors: Dict[Tuple[str, str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, agent_id: str, chain_type: str, stage: str, seconds: float):
+        with self._lock:
+            key = (agent_id, chain_type, stage)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].observe(seconds)
+
+    def record_error(self, agent_id: str, chain_type: str, stage: str):
+        with self._lock:
+            key = (agent_id, chain_type, stage)
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def summary(self, agent_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            keys = sorted(set(self._histograms) | set(self._errors))
+            summary = []
+            for key in keys:
+                if agent_id is not None and key[0] != agent_id:
+                    continue
+                histogram = self._histograms.get(key) or Histogram()
+                summary.append({
+                    "agent_id": key[0],
+                    "chain_type": key[1],
+                    "stage": key[2],
+                    "count": histogram.count,
+                    "errors": self._errors.get(key, 0),
+                    "avg": histogram.sum / histogram.count if histogram.count else None,
+                    **{f"p{int(q * 100)}": histogram.quantile(q) for q in QUANTILES}
+                })
+            return summary
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP rag_stage_duration_seconds Time spent in each stage of a chat chain.",
+            "# TYPE rag_stage_duration_seconds histogram",
+        ]
+        with self._lock:
+            for (agent_id, chain_type, stage), histogram in sorted(self._histograms.items()):
+                labels = f'agent="{_escape(agent_id)}",chain_type="{_escape(chain_type)}",stage="{stage}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'rag_stage_duration_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+                lines.append(f"rag_stage_duration_seconds_sum{{{labels}}} {histogram.sum}")
+                lines.append(f"rag_stage_duration_seconds_count{{{labels}}} {histogram.count}")
+            lines.append("# HELP rag_stage_errors_total Stages of a chat chain that failed or were cancelled.")
+            lines.append("# TYPE rag_stage_errors_total counter")
+            for (agent_id, chain_type, stage), count in sorted(self._errors.items()):
+                labels = f'agent="{_escape(agent_id)}",chain_type="{_escape(chain_type)}",stage="{stage}"'
+                lines.append(f"rag_stage_errors_total{{{labels}}} {count}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class StageTimingHandler(BaseCallbackHandler):
+    """Times the stages of one chain invocation from LangChain callbacks.
+
+    Named runs map directly to a stage. An LLM call is attributed by its
+    nearest named ancestor: inside the history-aware retriever it is
+    question contextualization, inside SQL generation it is already part
+    of that stage, and anywhere else it is answer generation.
+    """
+
+    run_inline = True
+
+    def __init__(self, agent_id: str, chain_type: str, metrics: Optional[StageMetrics] = None):
+        self.agent_id = agent_id
+        self.chain_type = chain_type
+        self.metrics = metrics or stage_metrics
+        self._runs: Dict[UUID, Tuple[Optional[UUID], Optional[str]]] = {}
+        self._timers: Dict[UUID, Tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, parent_run_id: Optional[UUID], name: Optional[str]):
+        self._runs[run_id] = (parent_run_id, name)
+        stage = STAGE_RUN_NAMES.get(name)
+        if stage:
+            self._timers[run_id] = (stage, time.perf_counter())
+
+    def _end(self, run_id: UUID, failed: bool = False):
+        self._runs.pop(run_id, None)
+        timer = self._timers.pop(run_id, None)
+        if timer:
+            stage, started = timer
+            if failed:
+                self.metrics.record_error(self.agent_id, self.chain_type, stage)
+            else:
+                self.metrics.observe(self.agent_id, self.chain_type, stage, time.perf_counter() - started)
+
+    def _llm_stage(self, parent_run_id: Optional[UUID]) -> Optional[str]:
+        while parent_run_id is not None and parent_run_id in self._runs:
+            parent_run_id, name = self._runs[parent_run_id]
+            if name == CONTEXTUALIZATION_RUN_NAME:
+                return "contextualization"
+            if name == "sql_generation":
+                return None
+        return "llm_generation"
+
+    def _start_llm(self, run_id: UUID, parent_run_id: Optional[UUID]):
+        self._runs[run_id] = (parent_run_id, None)
+        stage = self._llm_stage(parent_run_id)
+        if stage:
+            self._timers[run_id] = (stage, time.perf_counter())
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name"))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id: UUID, **kwargs):
+        self._end(run_id, failed=True)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._start_llm(run_id, parent_run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._start_llm(run_id, parent_run_id)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._end(run_id, failed=True)
+
+    def on_retriever_start(self, serialized, query, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name"))
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs):
+        self._end(run_id)
+
+    def on_retriever_error(self, error, *, run_id: UUID, **kwargs):
+        self._end(run_id, failed=True)
+
+stage_metrics = StageMetrics()
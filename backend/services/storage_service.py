@@ -1,19 +1,61 @@
 # File: app/services/storage_service.py
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
-from typing import BinaryIO, Optional
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional
+import hashlib
+import os
+import aiofiles
+from fastapi import UploadFile
 from core.models import S3Config
+from config.settings import settings
+
+class UploadTooLargeError(Exception):
+    pass
+
+async def save_upload_file(
+    upload: UploadFile,
+    destination: Path,
+    max_bytes: int,
+    chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+) -> Dict[str, Any]:
+    """Stream an upload to disk in fixed-size chunks, hashing it on the way.
+
+    Never holds more than one chunk in memory. The partial file is removed
+    if the upload exceeds max_bytes or the write fails.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(destination, "wb") as buffer:
+            while chunk := await upload.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(f"{upload.filename} exceeds the upload size limit of {max_bytes} bytes")
+                digest.update(chunk)
+                await buffer.write(chunk)
+    except Exception:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    return {"size": size, "sha256": digest.hexdigest()}
 
 class StorageService:
     def __init__(self, s3_config: Optional[S3Config] = None):
         self.s3_config = s3_config
         self.s3_client = None
         if s3_config:
+            # boto3 clients are thread-safe; one client shares a keep-alive
+            # pool across all concurrent downloads of a job. endpoint_url
+            # points the client at an S3-compatible store such as MinIO.
             self.s3_client = boto3.client(
                 's3',
                 aws_access_key_id=s3_config.aws_access_key,
                 aws_secret_access_key=s3_config.aws_secret_key,
-                region_name=s3_config.region_name
+                region_name=s3_config.region_name,
+                endpoint_url=s3_config.endpoint_url,
+                config=Config(max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS)
             )
 
     async def download_from_s3(self, file_key: str) -> BinaryIO:
@@ -26,4 +68,40 @@ class StorageService:
             )
             return response['Body']
         except ClientError as e:
-            raise Exception(f"Error downloading from S3: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Error downloading from S3: {str(e)}")
+
+    def list_objects(self, prefix: str = "") -> List[Dict[str, Any]]:
+        if not self.s3_client:
+            raise ValueError("S3 not configured")
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        objects = []
+        for page in paginator.paginate(Bucket=self.s3_config.bucket_name, Prefix=prefix):
+            objects.extend(page.get('Contents', []))
+        return objects
+
+    def download_to_file(
+        self,
+        file_key: str,
+        destination: str,
+        chunk_size: int = settings.UPLOAD_CHUNK_SIZE
+    ) -> Dict[str, Any]:
+        """Stream an object to disk chunk by chunk, hashing it on the way."""
+        if not self.s3_client:
+            raise ValueError("S3 not configured")
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            response = self.s3_client.get_object(
+                Bucket=self.s3_config.bucket_name,
+                Key=file_key
+            )
+            with open(destination, "wb") as f:
+                for chunk in response['Body'].iter_chunks(chunk_size):
+                    size += len(chunk)
+                    digest.update(chunk)
+                    f.write(chunk)
+        except ClientError as e:
+            if os.path.exists(destination):
+                os.remove(destination)
+            raise Exception(f"Error downloading from S3: {str(e)}")
+        return {"size": size, "sha256": digest.hexdigest()}
@@ -0,0 +1,34 @@
+import threading
+import time
+from core.cache import TTLCache
+
+def test_get_or_create_builds_once_after_a_failed_build():
+    cache = TTLCache()
+    builds = []
+
+    def factory():
+        builds.append(1)
+        time.sleep(0.1)
+        if len(builds) == 1:
+            raise RuntimeError("first build fails")
+        return "value"
+
+    results = []
+
+    def worker():
+        try:
+            results.append(cache.get_or_create("key", factory))
+        except RuntimeError:
+            results.append(None)
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.01)
+    for thread in threads:
+        thread.join()
+
+    # One failed build, then exactly one successful build shared by the rest
+    assert len(builds) == 2
+    assert results.count("value") == 4
+    assert not cache._key_locks
@@ -0,0 +1,90 @@
+import asyncio
+import json
+from fastapi import FastAPI
+from api.dependencies import get_db, get_llm_service
+from api.routes import chat
+
+AGENT_ID = "agent-1"
+
+class FakeAgents:
+    async def find_one(self, query):
+        return {"id": AGENT_ID, "config": {"llm": "model", "embeddings_model": "embeddings", "collection": "docs"}}
+
+class FakeDB:
+    agents = FakeAgents()
+
+class SlowChain:
+    """Yields one chunk, then stalls like a slow LLM stream."""
+
+    def __init__(self):
+        self.closed = False
+
+    async def astream(self, inputs, config=None):
+        try:
+            yield {"answer": "first"}
+            await asyncio.sleep(30)
+            yield {"answer": "never sent"}
+        finally:
+            self.closed = True
+
+def test_disconnect_mid_stream_records_cancelled(monkeypatch):
+    chain = SlowChain()
+    recorded = []
+    monkeypatch.setattr(chat.chain_registry, "get_or_build", lambda *args, **kwargs: chain)
+    monkeypatch.setattr(
+        chat.metrics_aggregator,
+        "record",
+        lambda agent_id, **kwargs: recorded.append((agent_id, kwargs))
+    )
+
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api")
+    app.dependency_overrides[get_db] = lambda: FakeDB()
+    app.dependency_overrides[get_llm_service] = lambda: None
+
+    body = json.dumps({
+        "agent_id": AGENT_ID,
+        "messages": [{"role": "user", "content": "hello"}]
+    }).encode()
+    path = f"/api/agents/{AGENT_ID}/chat"
+
+    async def run():
+        first_chunk_sent = asyncio.Event()
+        request_sent = False
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # The client goes away once it has seen the first chunk
+            await first_chunk_sent.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message.get("body"):
+                first_chunk_sent.set()
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode())
+            ],
+            "client": ("testclient", 50000),
+            "server": ("testserver", 80)
+        }
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+
+    asyncio.run(run())
+
+    assert recorded == [(AGENT_ID, {"outcome": "cancelled"})]
+    assert chain.closed
@@ -0,0 +1,30 @@
+import asyncio
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.prompts import ChatPromptTemplate
+from services.llm_hedging import HedgedChatModel
+from services.stage_metrics import StageMetrics, StageTimingHandler
+
+def _model(count):
+    return GenericFakeChatModel(messages=iter([AIMessage(content="hello world")] * count))
+
+def test_hedged_calls_are_observed_once_each():
+    metrics = StageMetrics()
+    chain = ChatPromptTemplate.from_messages([("human", "{question}")]) | HedgedChatModel(
+        models=[_model(2), _model(2)],
+        names=["primary", "fallback"],
+        first_token_deadline=5
+    )
+    config = {"callbacks": [StageTimingHandler("agent", "rag", metrics)]}
+
+    async def run():
+        await chain.ainvoke({"question": "hi"}, config=config)
+        async for _ in chain.astream({"question": "hi"}, config=config):
+            pass
+
+    asyncio.run(run())
+
+    [stage] = metrics.summary()
+    assert stage["stage"] == "llm_generation"
+    assert stage["count"] == 2
+    assert stage["errors"] == 0
@@ -0,0 +1,24 @@
+import asyncio
+from pymongo.errors import BulkWriteError
+from services.metrics_aggregator import MetricsAggregator
+
+class FailingCollection:
+    def __init__(self, failed_agent):
+        self.failed_agent = failed_agent
+
+    async def bulk_write(self, operations, ordered=True):
+        failed = [i for i, op in enumerate(operations) if op._filter["agent_id"] == self.failed_agent]
+        raise BulkWriteError({"writeErrors": [{"index": i, "code": 2, "errmsg": "bad"} for i in failed]})
+
+def test_flush_requeues_only_rejected_operations():
+    aggregator = MetricsAggregator(interval=60)
+    collection = FailingCollection("b")
+    aggregator._db = {"metrics_hourly": collection, "metrics": collection, "metrics_monthly": collection}
+    aggregator.record("a")
+    aggregator.record("b")
+
+    asyncio.run(aggregator.flush())
+
+    for buckets in aggregator._unflushed.values():
+        assert [agent_id for agent_id, _ in buckets] == ["b"]
+        assert all(counters["calls"] == 1 for counters in buckets.values())
@@ -0,0 +1,18 @@
+import uuid
+from services.stage_metrics import StageMetrics, StageTimingHandler
+
+def test_failed_stages_are_counted_but_not_timed():
+    metrics = StageMetrics()
+    handler = StageTimingHandler("agent", "rag", metrics)
+
+    ok, failed = uuid.uuid4(), uuid.uuid4()
+    handler.on_retriever_start({}, "q", run_id=ok, name="vector_search")
+    handler.on_retriever_end([], run_id=ok)
+    handler.on_retriever_start({}, "q", run_id=failed, name="vector_search")
+    handler.on_retriever_error(RuntimeError("boom"), run_id=failed)
+
+    [stage] = metrics.summary()
+    assert stage["stage"] == "vector_search"
+    assert stage["count"] == 1
+    assert stage["errors"] == 1
+    assert 'rag_stage_errors_total{agent="agent",chain_type="rag",stage="vector_search"} 1' in metrics.render_prometheus()
@@ -0,0 +1,34 @@
+# File: app/worker.py
+import asyncio
+import signal
+from dotenv import load_dotenv
+
+load_dotenv('.backend.env')
+
+from api.dependencies import connect_db, close_db
+from config.settings import settings
+from services.ingestion_jobs import JOB_HANDLERS
+from services.ingestion_pipeline import shutdown_process_pool
+from services.job_queue import JobWorker
+
+async def main():
+    if not settings.CHROMA_HOST:
+        raise SystemExit(
+            "worker.py needs a Chroma server (CHROMA_HOST); the embedded "
+            "store cannot be shared with the API process"
+        )
+    client = connect_db()
+    worker = JobWorker(client[settings.DB_NAME], JOB_HANDLERS, settings.JOB_WORKER_CONCURRENCY)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    try:
+        await worker.run()
+    finally:
+        shutdown_process_pool()
+        close_db()
+
+if __name__ == "__main__":
+    asyncio.run(main())
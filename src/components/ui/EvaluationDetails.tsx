@@ -1,14 +1,42 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
+import axios from 'axios';
 import { Card, CardHeader, CardTitle, CardContent } from '@/components/ui/card';
 import { Loader2 } from 'lucide-react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
-import type { Evaluation } from '../../types/types';
+import type { Evaluation, EvaluationResultsPage } from '../../types/types';
 
 interface EvaluationDetailsProps {
   evaluation: Evaluation;
 }
 
 export const EvaluationDetails: React.FC<EvaluationDetailsProps> = ({ evaluation }) => {
+  const [results, setResults] = useState<EvaluationResultsPage['results']>([]);
+  const [nextCursor, setNextCursor] = useState<number | null>(null);
+  const [isLoadingResults, setIsLoadingResults] = useState(false);
+  const baseURL = import.meta.env.VITE_BACKEND_BASE_URL || '';
+
+  const fetchResults = async (cursor: number = -1) => {
+    setIsLoadingResults(true);
+    try {
+      const response = await axios.get<EvaluationResultsPage>(
+        `${baseURL}/api/agents/${evaluation.agent_id}/evaluations/${evaluation.job_id}/results`,
+        { params: { cursor } }
+      );
+      setResults(prev => cursor < 0 ? response.data.results : [...prev, ...response.data.results]);
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error('Error fetching evaluation results:', error);
+    } finally {
+      setIsLoadingResults(false);
+    }
+  };
+
+  useEffect(() => {
+    if (evaluation.status === 'completed') {
+      fetchResults();
+    }
+  }, [evaluation.job_id, evaluation.status]);
+
   const formatDate = (dateString: string) => {
     return new Date(dateString).toLocaleString();
   };
@@ -116,8 +144,8 @@ export const EvaluationDetails: React.FC<EvaluationDetailsProps> = ({ evaluation
           <div className="h-40">
             <ResponsiveContainer width="100%" height="100%">
               <LineChart 
-                data={evaluation.results.map((result, index) => ({
-                  index: index + 1,
+                data={results.map((result) => ({
+                  index: result.index + 1,
                   similarity: result.similarity_score
                 }))}
               >
@@ -155,12 +183,12 @@ export const EvaluationDetails: React.FC<EvaluationDetailsProps> = ({ evaluation
         <div className="mt-6">
           <h3 className="font-medium mb-4">Detailed Results</h3>
           <div className="space-y-4 max-h-96 overflow-y-auto">
-            {evaluation.results.map((result, index) => (
-              <Card key={index}>
+            {results.map((result) => (
+              <Card key={result.index}>
                 <CardContent className="p-4">
                   <div className="flex justify-between items-start mb-2">
                     <span className="font-medium text-gray-700">
-                      Question {index + 1}
+                      Question {result.index + 1}
                     </span>
                     <span className={`px-2 py-1 rounded-full text-sm ${
                       result.similarity_score >= 0.7
@@ -191,6 +219,15 @@ export const EvaluationDetails: React.FC<EvaluationDetailsProps> = ({ evaluation
                 </CardContent>
               </Card>
             ))}
+            {nextCursor !== null && (
+              <button
+                onClick={() => fetchResults(nextCursor)}
+                disabled={isLoadingResults}
+                className="w-full px-4 py-2 text-sm text-blue-600 hover:bg-blue-50 rounded-md disabled:opacity-50"
+              >
+                {isLoadingResults ? 'Loading...' : 'Load more results'}
+              </button>
+            )}
           </div>
         </div>
       </CardContent>
@@ -37,6 +37,8 @@ export interface EmbeddingsConfig {
     contextualization_prompt?: string;
     temperature?: number;
     advancedLLMConfig?: LLMConfig;
+    fallback_llms?: string[];
+    first_token_deadline?: number;
     sql_config?: SQLConfig;
     s3_config?: S3Config;
     advancedEmbeddingsConfig?: EmbeddingsConfig;
@@ -247,7 +249,12 @@ export interface EmbeddingsConfig {
     job_id: string;
     timestamp: string;
     status: EvaluationStatus;
-    results: EvaluationResult[];
+    total_questions?: number;
     aggregate_metrics: AggregateMetrics;
     error?: string;
+  }
+
+  export interface EvaluationResultsPage {
+    results: (EvaluationResult & { index: number })[];
+    next_cursor: number | null;
   }
\ No newline at end of file